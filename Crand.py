@@ -1,24 +1,105 @@
 import random
 
+import numpy as np
+
+
+def _allowed_range(a, b, exclude):
+    """The sorted excluded values that actually fall inside a..b."""
+    exclude = sorted(e for e in set(exclude) if a <= e <= b)
+    if b - a + 1 <= len(exclude):
+        raise ValueError(f"No values left between {a} and {b} once {exclude} are excluded")
+    return exclude
+
+
+class Sampler:
+    """A seeded random stream.
+
+    The same seed always gives the same sequence of draws, so a worksheet can be rebuilt from its seed.
+    Single values come from a random.Random and size= draws from a numpy Generator, both derived from the
+    same seed. Excluded values are skipped by mapping the draw onto the allowed values instead of re-rolling.
+    """
+
+    def __init__(self, seed=None):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        # When no seed is given the fresh entropy is kept, so the stream can still be reproduced
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.random = random.Random(int(self.seed_sequence.generate_state(2, np.uint64)[0]))
+
+    def randint(self, a, b, exclude=(), size=None):
+        """Random integer between a and b, inclusive, that is not in exclude."""
+        exclude = _allowed_range(a, b, exclude)
+        if size is None:
+            result = self.random.randint(a, b - len(exclude))
+            # Shift past each excluded value in increasing order
+            for e in exclude:
+                if result >= e:
+                    result += 1
+            return result
+        result = self.rng.integers(a, b + 1 - len(exclude), size=size)
+        for e in exclude:
+            result += result >= e
+        return result
+
+    def non_zero_randint(self, a, b, size=None):
+        """Random integer between a and b, inclusive, that is never zero."""
+        return self.randint(a, b, (0,), size)
+
+    def non_zero_one_randint(self, a, b, size=None):
+        """Random integer between a and b, inclusive, that is never zero or one."""
+        return self.randint(a, b, (0, 1), size)
+
+    def choice(self, options, size=None):
+        """Random element of options."""
+        if len(options) == 0:
+            raise ValueError("At least one option is required")
+        if size is None:
+            return self.random.choice(options)
+        return np.asarray(options)[self.rng.integers(0, len(options), size=size)]
+
+    def sign(self, size=None):
+        """1 or -1 with equal chance."""
+        return self.choice([1, -1], size)
+
+    def spawn(self, n):
+        """n independent child streams, e.g. one per worker process or worksheet."""
+        return [Sampler(child) for child in self.seed_sequence.spawn(n)]
+
+
+_default_sampler = Sampler()
+
+
+def default_sampler():
+    """The stream used when no sampler is passed in."""
+    return _default_sampler
+
+
+def sampler(rng=None):
+    """A Sampler from a seed, None or a Sampler."""
+    return rng if isinstance(rng, Sampler) else Sampler(rng)
+
+
+def seed(value=None):
+    """Restart the default stream from a seed."""
+    global _default_sampler
+    _default_sampler = Sampler(value)
+
 
 def non_zero_one_randint(a, b):
-    """Generate a random integer between a and b, inclusive, but re-roll if it's zero or one."""
-    result = 0
-    while result == 0 or result == 1:
-        result = random.randint(a, b)
-    return result
+    """Generate a random integer between a and b, inclusive, that is never zero or one."""
+    return _default_sampler.non_zero_one_randint(a, b)
 
 
 def non_zero_randint(a, b):
-    """Generate a random integer between a and b, inclusive, but re-roll if it's zero."""
-    result = 0
-    while result == 0:
-        result = random.randint(a, b)
-    return result
+    """Generate a random integer between a and b, inclusive, that is never zero."""
+    return _default_sampler.non_zero_randint(a, b)
 
 
 def rand_op(*args):
     """Choose a random operator from the provided arguments."""
     if len(args) == 0:
         raise ValueError("At least one argument is required")
-    return random.choice(args)
+    return _default_sampler.choice(args)
@@ -0,0 +1,93 @@
+"""Open a large document and scroll through it.
+
+Run from the repository root:
+
+    python benchmarks/bench_pages.py [--pages 500] [--items 12] [--no-virtual]
+
+Reports how long it takes to build the document and scroll from the first page to the last,
+how many page views exist and the peak memory of the process.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def wait_for_renders(app, mrender):
+    while mrender.default_pool().pending():
+        app.processEvents()
+        time.sleep(0.001)
+    # The scroll area needs a couple of passes to lay out new pages
+    for _ in range(3):
+        app.processEvents()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--items", type=int, default=12, help="equations on every page")
+    parser.add_argument("--no-virtual", action="store_true", help="keep a view for every page, like before")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication([])
+    import main as gui
+    import mgen
+    import mrender
+
+    window = gui.MyGui()
+    window.questionPages.virtual = not args.no_virtual
+    window.tabWidget.setCurrentIndex(1)
+    if args.no_virtual:
+        window.questionPages[0].attach()
+
+    # Render the equations once up front so the timings below are about pages, not mathtext
+    rows = mgen.generate_batch("3B", "Hard", args.items * 4, 1).rows()
+    for _, question, _ in rows:
+        mrender.default_pool().request(question, lambda pixmap: None)
+    wait_for_renders(app, mrender)
+
+    start = time.perf_counter()
+    for page in range(args.pages):
+        if page:
+            slot = window.add_question_page(window.scrollAreaWidgetContents)
+        else:
+            slot = window.questionPages[0]
+        if args.no_virtual:
+            slot.attach()
+        for i in range(args.items):
+            _, question, answer = rows[(page + i) % len(rows)]
+            item = gui.EditableTextItem("3B", "Hard")
+            item.setPlainText(question)
+            item.answer = answer
+            slot.scene().addItem(item)
+            item.setPos(60, 60 + i * 80)
+    wait_for_renders(app, mrender)
+    build = time.perf_counter() - start
+
+    bar = window.scrollArea.verticalScrollBar()
+    step = max(1, bar.pageStep())
+    start = time.perf_counter()
+    frames = 0
+    for value in range(0, bar.maximum() + step, step):
+        bar.setValue(value)
+        app.processEvents()
+        window.questionPages.update_views()
+        window.scrollArea.viewport().repaint()
+        frames += 1
+    scroll = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"pages: {args.pages}, items per page: {args.items}, virtual: {not args.no_virtual}")
+    print(f"build: {build:.2f}s, scroll through: {scroll:.2f}s ({scroll / frames * 1000:.1f} ms per step)")
+    print(f"live page views: {window.questionPages.live_views()}, peak memory: {peak:.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Compare the native Poly engine in mgen with the old sympy expand path.
+
+Run from the repository root:
+
+    python benchmarks/bench_poly.py [count]
+
+Every generated question is also cross-checked with sympy.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Crand
+import mgen
+from poly import check_with_sympy, sympy_parse
+
+GENERATORS = [
+    ("3A", lambda d: mgen.generate_linear_equation(d)[1:]),
+    ("3B", lambda d: mgen.generate_factorise_equation(d)[:0:-1]),
+]
+
+
+def sympy_expand(text):
+    """The expansion step the generators used before Poly: parse, sp.expand and clean up the string."""
+    import sympy as sp
+    return str(sp.expand(sympy_parse(text))).replace('**', '^').replace('*', '')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    Crand.seed(1)
+    print(f"{'topic':<6}{'difficulty':<12}{'native/q':>12}{'sympy/q':>12}{'speedup':>10}")
+    for topic, generate in GENERATORS:
+        for difficulty in ("Easy", "Medium", "Hard"):
+            start = time.perf_counter()
+            pairs = [generate(difficulty) for _ in range(count)]
+            native = (time.perf_counter() - start) / count
+
+            start = time.perf_counter()
+            for original, _ in pairs:
+                sympy_expand(original)
+            symbolic = (time.perf_counter() - start) / count
+
+            bad = [pair for pair in pairs[:500] if not check_with_sympy(*pair)]
+            if bad:
+                print(f"Mismatch for {topic} {difficulty}: {bad[:3]}")
+            print(f"{topic:<6}{difficulty:<12}{native * 1e6:>10.1f}us{symbolic * 1e6:>10.1f}us"
+                  f"{symbolic / native:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,485 @@
+"""Benchmark suite for generation, rendering, layout, interaction, PDF and text export.
+
+Run from the repository root:
+
+    python benchmarks/suite.py [--filter render] [--out results.json]
+    python benchmarks/suite.py --save-baseline
+
+Every benchmark is timed in several rounds of at least MIN_TIME each and the median round is kept.
+The results are written as JSON and compared with benchmarks/baseline.json. Anything slower than
+the baseline by more than its group's tolerance (TOLERANCES, or --tolerance) is reported as a
+regression and the exit status is 1. Baselines only make sense on the machine
+that recorded them, so record a new one with --save-baseline after moving to another machine.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+RENDER_COUNT = 50
+GENERATE_COUNT = 50
+SCENE_ITEMS = 1000
+EXPORT_PAGES = 20
+TEXT_EXPORT_QUESTIONS = 1000
+# Items on each page for the drag and scroll frame times, with and without performance mode
+INTERACTION_ITEMS = (100, 500, 1000)
+INTERACTION_FRAMES = 30
+INTERACTION_PAGES = 4
+# Mouse moves that arrive between two frames while dragging
+MOVES_PER_FRAME = 4
+SCROLL_STEP = 60
+
+# Shortest round of a measurement in seconds, and the number of rounds
+MIN_TIME = 0.2
+REPEAT = 7
+# Allowed slow down of groups that are noisier than --tolerance allows: frame times depend on the
+# event loop and window system, exports on a writer thread, and generation takes microseconds so
+# the machine changing speed during the group is not fully taken out by the reference
+TOLERANCES = {"generate": 0.75, "interaction": 0.75, "export": 0.4}
+
+_app = None
+
+
+def median_time(function, repeat=REPEAT, min_time=MIN_TIME):
+    """Median wall clock time of one call, in seconds.
+
+    Like timeit, functions are called in a loop until a round takes at least min_time, and the
+    median of several rounds is kept. One untimed call first warms up caches.
+    """
+    function()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        # Aim a little past min_time instead of growing tenfold, slow calls would overshoot a lot
+        number = max(number + 1, int(number * min_time * 1.2 / max(elapsed, 1e-9)))
+
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds)
+
+
+def reference_time():
+    """Time of a fixed pure Python workload, to tell a slower machine from slower code."""
+    def work():
+        total = 0
+        for i in range(20_000):
+            total += i * i % 7
+        return total
+    return median_time(work)
+
+
+def median_frame_time(measure, repeat=REPEAT, min_time=MIN_TIME):
+    """Median of rounds of measure(), which returns a mean frame time, each round lasting min_time."""
+    rounds = []
+    for _ in range(repeat):
+        times = []
+        start = time.perf_counter()
+        while not times or time.perf_counter() - start < min_time:
+            times.append(measure())
+        rounds.append(sum(times) / len(times))
+    return statistics.median(rounds)
+
+
+def application():
+    global _app
+    if _app is None:
+        from PyQt6.QtWidgets import QApplication
+        _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def wait_for_renders():
+    import mrender
+    app = application()
+    while mrender.default_pool().pending():
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+
+
+def sample_equations(count, seed=1):
+    import mgen
+    return [question for _, question, _ in mgen.generate_distinct("3B", "Hard", count, seed).rows()]
+
+
+def bench_generation():
+    import Crand
+    import mgen
+    import topics
+
+    results = {}
+    for code in topics.available():
+        topic = topics.get(code)
+        for difficulty in topics.DIFFICULTIES:
+            # One question at a time is what the GUI does. Every round draws the same questions, as
+            # some take much longer than others.
+            def one_at_a_time():
+                sampler = Crand.Sampler(1)
+                for _ in range(GENERATE_COUNT):
+                    topic.generate(difficulty, sampler)
+            results[f"generate/{code}/{difficulty}/1"] = median_time(one_at_a_time) / GENERATE_COUNT
+            sampler = Crand.Sampler(1)
+            if (code, difficulty) not in mgen.BATCH_SPECS:
+                continue
+            # Columnar batches, without formatting the text of every row
+            for n in (1000, 100_000):
+                results[f"generate/{code}/{difficulty}/{n}"] = median_time(
+                    lambda: mgen.generate_batch(code, difficulty, n, sampler))
+    return results
+
+
+def bench_rendering():
+    import mrender
+
+    application()
+    texts = sample_equations(RENDER_COUNT)
+    mrender.warm_up()
+    results = {}
+
+    # Cold: nothing cached anywhere, every equation goes through mathtext
+    def cold():
+        cache = mrender.RenderCache()
+        for text in texts:
+            cache.pixmap(text)
+    results["render/cold"] = median_time(cold) / RENDER_COUNT
+
+    # Warm: the pixmaps are in memory
+    cache = mrender.RenderCache()
+    for text in texts:
+        cache.pixmap(text)
+    results["render/warm"] = median_time(lambda: [cache.pixmap(text) for text in texts]) / RENDER_COUNT
+
+    # Disk: a new session with the PNGs already on disk
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = mrender.RenderCache(disk_dir=disk_dir)
+        for text in texts:
+            cache.pixmap(text)
+        results["render/disk"] = median_time(
+            lambda: [mrender.RenderCache(disk_dir=disk_dir).pixmap(text) for text in texts]) / RENDER_COUNT
+    return results
+
+
+def new_window():
+    import main as gui
+    app = application()
+    window = gui.MyGui()
+    app.processEvents()
+    return window
+
+
+def populate(window, texts, count):
+    import main as gui
+    items = []
+    for i in range(count):
+        item = gui.EditableTextItem("3B", "Hard")
+        item.setPlainText(texts[i % len(texts)])
+        items.append(item)
+    window.add_questions(items)
+    wait_for_renders()
+
+
+def bench_scene():
+    from PyQt6.QtCore import QCoreApplication, QEvent
+    import mrender
+
+    os.chdir(ROOT)
+    texts = sample_equations(RENDER_COUNT)
+    for text in texts:
+        mrender.default_pool().request(text, lambda pixmap: None)
+    wait_for_renders()
+
+    # Equations are already rendered, so this measures items, layout and pages
+    def run():
+        window = new_window()
+        populate(window, texts, SCENE_ITEMS)
+        window.close()
+        window.deleteLater()
+        # Delete it now, so old windows do not pile up and slow down the next round
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    return {f"scene/populate/{SCENE_ITEMS}": median_time(run)}
+
+
+def bench_export():
+    import mrender
+    import pdfexport
+
+    os.chdir(ROOT)
+    # Enough different questions to fill EXPORT_PAGES question pages
+    texts = sample_equations(EXPORT_PAGES * 12)
+    window = new_window()
+    populate(window, texts, len(texts))
+    while window.questionPageCount < EXPORT_PAGES:
+        window.add_question_page(window.scrollAreaWidgetContents)
+    scenes = window.questionPages.scenes()[:EXPORT_PAGES]
+    wait_for_renders()
+
+    def export(dirty=scenes, cold=False):
+        if cold:
+            # As if the outlines had not been made while rendering
+            mrender._paths.clear()
+        with tempfile.TemporaryDirectory() as out_dir:
+            for scene in dirty:
+                scene.mark_dirty()
+            job = pdfexport.PdfExport(scenes, os.path.join(out_dir, "export.pdf"))
+            done = []
+            job.finished.connect(done.append)
+            job.failed.connect(done.append)
+            job.start()
+            while not done:
+                application().processEvents()
+                time.sleep(0.001)
+    results = {
+        # Every page changed, with outlines made by the render pool
+        f"export/{EXPORT_PAGES}": median_time(export),
+        f"export/{EXPORT_PAGES}/one-edit": median_time(lambda: export(scenes[7:8])),
+        f"export/{EXPORT_PAGES}/clean": median_time(lambda: export([])),
+        f"export/{EXPORT_PAGES}/cold": median_time(lambda: export(cold=True)),
+    }
+    return results
+
+
+def bench_text_export():
+    import mgen
+    import textexport
+
+    rows = mgen.generate_distinct("3B", "Hard", TEXT_EXPORT_QUESTIONS, 1).rows()
+    # Twelve questions to a page, like a page of the GUI
+    questions = [{"topic": "3B", "text": text, "answer": answer, "page": i // 12}
+                 for i, (_, text, answer) in enumerate(rows)]
+
+    def export(kind):
+        with tempfile.TemporaryDirectory() as out_dir:
+            textexport.export(os.path.join(out_dir, f"worksheet.{kind}"), "Worksheet", questions)
+    return {f"textexport/{kind}/{TEXT_EXPORT_QUESTIONS}": median_time(lambda: export(kind))
+            for kind in ("tex", "html")}
+
+
+def dense_page(texts, count):
+    """A page scene crowded with count equation items."""
+    import main as gui
+    from pages import PAGE_HEIGHT, PAGE_WIDTH, PageScene
+
+    scene = PageScene()
+    scene.setSceneRect(0, 0, PAGE_WIDTH, PAGE_HEIGHT)
+    columns = 10
+    rows = -(-count // columns)
+    for i in range(count):
+        item = gui.EditableTextItem("3B", "Hard")
+        # Already rendered, so the pixmap is set straight away
+        item.setPlainText(texts[i % len(texts)])
+        item.setPos((i % columns) * (PAGE_WIDTH - 200) / columns, (i // columns) * (PAGE_HEIGHT - 60) / rows)
+        scene.addItem(item)
+    return scene
+
+
+def frame(app):
+    # A drag step posts a timer, the move posts a scene update and that posts the repaint
+    for _ in range(3):
+        app.processEvents()
+
+
+def drag_frame_time(app, view):
+    """Mean time of a frame while the item at the middle of view is dragged across it."""
+    from PyQt6.QtCore import QEvent, QPoint, QPointF, Qt
+    from PyQt6.QtGui import QMouseEvent
+
+    viewport = view.viewport()
+
+    def send(kind, point, buttons):
+        event = QMouseEvent(kind, QPointF(point), QPointF(viewport.mapToGlobal(point)), Qt.MouseButton.LeftButton,
+                            buttons, Qt.KeyboardModifier.NoModifier)
+        app.sendEvent(viewport, event)
+
+    start = view.mapFromScene(view.sceneRect().center())
+    send(QEvent.Type.MouseButtonPress, start, Qt.MouseButton.LeftButton)
+    frame(app)
+    item = view.scene().mouseGrabberItem()
+    if item is None:
+        raise RuntimeError("Nothing to drag in the middle of the page")
+    moved_from = item.pos()
+    began = time.perf_counter()
+    for step in range(INTERACTION_FRAMES):
+        for move in range(MOVES_PER_FRAME):
+            send(QEvent.Type.MouseMove, start + QPoint(step * 4 + move, step * 3), Qt.MouseButton.LeftButton)
+        frame(app)
+    elapsed = time.perf_counter() - began
+    send(QEvent.Type.MouseButtonRelease, start + QPoint(INTERACTION_FRAMES * 4, INTERACTION_FRAMES * 3),
+         Qt.MouseButton.NoButton)
+    frame(app)
+    # Put it back for the next round
+    item.setPos(moved_from)
+    frame(app)
+    return elapsed / INTERACTION_FRAMES
+
+
+def scroll_frame_time(app, scroll_area):
+    """Mean time of a frame while scroll_area scrolls from top to bottom."""
+    bar = scroll_area.verticalScrollBar()
+    bar.setValue(0)
+    frame(app)
+    steps = range(SCROLL_STEP, bar.maximum() + 1, SCROLL_STEP)
+    began = time.perf_counter()
+    for value in steps:
+        bar.setValue(value)
+        frame(app)
+    return (time.perf_counter() - began) / max(len(steps), 1)
+
+
+def bench_interaction():
+    from PyQt6.QtWidgets import QScrollArea, QWidget
+    import mrender
+    import pages
+    from pages import PageList, SelectableGraphicsView
+
+    os.chdir(ROOT)
+    app = application()
+    texts = sample_equations(RENDER_COUNT)
+    for text in texts:
+        mrender.default_pool().request(text, lambda pixmap: None)
+    wait_for_renders()
+
+    results = {}
+    for mode in ("normal", "performance"):
+        pages.set_performance_mode(mode == "performance")
+        for count in INTERACTION_ITEMS:
+            scene = dense_page(texts, count)
+            view = SelectableGraphicsView(scene)
+            view.resize(pages.PAGE_WIDTH, pages.VIEW_HEIGHT)
+            view.show()
+            frame(app)
+            results[f"interaction/drag/{mode}/{count}"] = median_frame_time(lambda: drag_frame_time(app, view))
+            view.close()
+            view.deleteLater()
+
+            scroll_area = QScrollArea()
+            contents = QWidget()
+            scroll_area.setWidget(contents)
+            scroll_area.setWidgetResizable(True)
+            scroll_area.resize(pages.PAGE_WIDTH + 40, pages.VIEW_HEIGHT)
+            page_list = PageList(scroll_area, contents)
+            for index in range(INTERACTION_PAGES):
+                page_list.add_page(dense_page(texts, count), f"Page {index + 1}")
+            scroll_area.show()
+            frame(app)
+            results[f"interaction/scroll/{mode}/{count}"] = median_frame_time(lambda: scroll_frame_time(app, scroll_area))
+            scroll_area.close()
+            scroll_area.deleteLater()
+            app.sendPostedEvents(None, 52)  # QEvent.Type.DeferredDelete
+    pages.set_performance_mode(False)
+    return results
+
+
+BENCHMARKS = {
+    "generate": bench_generation,
+    "render": bench_rendering,
+    "scene": bench_scene,
+    "export": bench_export,
+    "textexport": bench_text_export,
+    "interaction": bench_interaction,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Print every result next to its baseline and return the names that got slower.
+
+    tolerance applies to the groups that have no entry in TOLERANCES.
+    """
+    regressions = []
+    print(f"{'benchmark':<32}{'time':>12}{'baseline':>12}{'change':>10}")
+    for name, seconds in sorted(results.items()):
+        base = baseline.get(name)
+        if base:
+            change = seconds / base - 1
+            allowed = TOLERANCES.get(name.split("/")[0], tolerance)
+            flag = "  SLOWER" if change > allowed else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<32}{seconds * 1000:>10.3f}ms{base * 1000:>10.3f}ms{change:>+9.0%}{flag}")
+        else:
+            print(f"{name:<32}{seconds * 1000:>10.3f}ms{'-':>12}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run benchmarks whose group contains this")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slow down of groups not in TOLERANCES, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    # Keep the user's render cache out of the measurements
+    os.environ["SAT_RENDER_CACHE"] = ""
+
+    # Shared and virtual machines change speed from minute to minute. The reference workload is
+    # timed before and after every group, and the group's results are scaled by how fast it ran
+    # against the baseline.
+    results, reference = {}, {}
+    for group, bench in BENCHMARKS.items():
+        if args.filter in group:
+            print(f"Running {group}...", file=sys.stderr)
+            before = reference_time()
+            results.update(bench())
+            reference[group] = (before + reference_time()) / 2
+
+    document = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "reference": reference,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(document, f, indent=1, sort_keys=True)
+
+    baseline, baseline_reference = {}, {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        baseline_reference = saved.get("reference", {})
+    speed = {group: seconds / baseline_reference.get(group, seconds) for group, seconds in reference.items()}
+    if args.save_baseline:
+        regressions = compare(results, {}, args.tolerance)
+    else:
+        for group, factor in speed.items():
+            print(f"Reference workload took {factor:.2f}x its baseline time during {group}, "
+                  f"its results are scaled by that")
+        regressions = compare({name: seconds / speed[name.split("/")[0]] for name, seconds in results.items()},
+                              baseline, args.tolerance)
+
+    if args.save_baseline:
+        # Benchmarks left out by --filter keep their old baseline
+        document["results"] = {**baseline, **results}
+        document["reference"] = {**baseline_reference, **reference}
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=1, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Generate worksheets without the GUI.
+
+    python farm.py --topic 3B --difficulty Medium --count 200 --seed 42 --out worksheets/
+
+Every worksheet gets its own child stream of the seed, so the same command always writes the same
+worksheets no matter how many worker processes are used.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# The workers never show a window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import Crand
+import topics
+
+# A4 at 96 DPI, the same page size the GUI uses
+PAGE_WIDTH, PAGE_HEIGHT = 794, 1123
+MARGIN = 60
+ROW_GAP = 24
+NUMBER_WIDTH = 40
+
+_app = None
+
+
+def _init_worker():
+    """Start an offscreen QGuiApplication once per worker process so fonts and painting work."""
+    global _app
+    from PyQt6.QtGui import QGuiApplication
+    _app = QGuiApplication.instance() or QGuiApplication([])
+
+
+def write_pdf(path, title, equations, render=None):
+    """Write numbered equations to a PDF, starting a new page whenever one fills up.
+
+    With render, the equations are drawn by it as images (graphs) instead of as mathtext.
+    """
+    from PyQt6.QtCore import QMarginsF, QPointF, QRectF, Qt
+    from PyQt6.QtGui import QFont, QImage, QPageLayout, QPageSize, QPainter, QPdfWriter
+    import mrender
+
+    writer = QPdfWriter(path)
+    writer.setResolution(96)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    writer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Point)
+    writer.setTitle(title)
+
+    painter = QPainter(writer)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setFont(QFont("Sans Serif", 16))
+    painter.drawText(QPointF(MARGIN, MARGIN), title)
+    painter.setFont(QFont("Sans Serif", 12))
+
+    y = MARGIN + ROW_GAP
+    for number, text in enumerate(equations, start=1):
+        if render is not None:
+            image = QImage.fromData(render(text, mrender.FONT_SIZE, mrender.PRINT_DPI))
+            # Scale the high resolution image down to its size on a 96 DPI page
+            width, height = image.width() * 96 / mrender.PRINT_DPI, image.height() * 96 / mrender.PRINT_DPI
+        else:
+            # Equations are written as vector outlines, so the PDF stays sharp at any print size
+            path = mrender.math_path(text)
+            _, height = mrender.path_size(path)
+        if y + height > PAGE_HEIGHT - MARGIN:
+            writer.newPage()
+            y = MARGIN
+        painter.drawText(QPointF(MARGIN, y + height / 2 + 6), f"{number}.")
+        if render is not None:
+            painter.drawImage(QRectF(MARGIN + NUMBER_WIDTH, y, width, height), image)
+        else:
+            painter.fillPath(path.translated(MARGIN + NUMBER_WIDTH, y), Qt.GlobalColor.black)
+        y += height + ROW_GAP
+    painter.end()
+
+
+def make_worksheet(index, topic, difficulty, questions, sampler, out_dir):
+    """Generate and write one worksheet and its answer key. Runs inside a worker process."""
+    topic = topics.get(topic)
+    rows = topics.draw(topic.code, difficulty, questions, sampler)
+    name = f"worksheet_{index + 1:04d}"
+    title = f"{topic.code} {difficulty} - Worksheet {index + 1}"
+    write_pdf(os.path.join(out_dir, f"{name}.pdf"), title, [question for _, question, _ in rows], topic.render)
+    write_pdf(os.path.join(out_dir, f"{name}_answers.pdf"), f"{title} - Answers",
+              [topic.format_answer(answer) for _, _, answer in rows])
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write worksheets and answer keys as PDFs without opening a window.")
+    parser.add_argument("--topic", required=True, choices=topics.available())
+    parser.add_argument("--difficulty", default="Easy", choices=topics.DIFFICULTIES)
+    parser.add_argument("--count", type=int, default=30, help="number of worksheets, one per student")
+    parser.add_argument("--questions", type=int, default=10, help="questions on each worksheet")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible worksheets")
+    parser.add_argument("--out", default="worksheets", help="output folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    # Found out here rather than in every worker once the pool has started
+    available = topics.question_count(args.topic, args.difficulty)
+    if available is not None and args.questions > available:
+        parser.error(f"only {available} different {args.topic} {args.difficulty} questions exist, "
+                     f"but --questions is {args.questions}")
+
+    os.makedirs(args.out, exist_ok=True)
+    sampler = Crand.Sampler(args.seed)
+    print(f"Seed {sampler.seed}")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        jobs = [pool.submit(make_worksheet, index, args.topic, args.difficulty, args.questions, child, args.out)
+                for index, child in enumerate(sampler.spawn(args.count))]
+        for done, job in enumerate(as_completed(jobs), start=1):
+            job.result()
+            print(f"\r{done}/{args.count} worksheets", end="", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"\nWrote {args.count} worksheets to {args.out} in {elapsed:.1f}s "
+          f"({args.count / elapsed:.1f} worksheets/s)")
+
+
+if __name__ == '__main__':
+    main()
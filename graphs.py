@@ -0,0 +1,177 @@
+"""Graph questions for 3D Graphing Quadratics.
+
+A graph question shows the parabola y = ax^2 + bx + c with its x intercepts, turning point and
+y intercept marked, and asks for its equation. The question text is a key like "graph 1 -2 -3",
+which render_graph turns into a PNG. Graphs go through the same RenderCache as equations, so every
+parabola is drawn once.
+
+All graphs are drawn on one Figure and Axes that are kept between calls. Only the data of the
+curve, points and labels changes, which is much faster than building a figure for every graph.
+"""
+import math
+from io import BytesIO
+
+import numpy as np
+
+import Crand
+import instrument
+import mgen
+import mrender
+from poly import Poly
+
+# Size of a graph in inches, at the render DPI
+GRAPH_WIDTH, GRAPH_HEIGHT = 3.2, 2.4
+GRID_POINTS = 200
+# Labelled points: two x intercepts, the turning point and the y intercept
+MAX_LABELS = 4
+
+_figure = None
+
+
+def graph_text(a, b, c):
+    """Question text, and render cache key, of the graph of ax^2 + bx + c."""
+    return f"graph {a} {b} {c}"
+
+
+def coefficients(text):
+    _, a, b, c = text.split()
+    return int(a), int(b), int(c)
+
+
+def features(a, b, c):
+    """Closed form key points of y = ax^2 + bx + c.
+
+    Returns a dict with the real x intercepts (sorted, one for a repeated root), the turning point
+    and the y intercept.
+    """
+    discriminant = b * b - 4 * a * c
+    if discriminant > 0:
+        root = math.sqrt(discriminant)
+        roots = sorted(((-b - root) / (2 * a), (-b + root) / (2 * a)))
+    elif discriminant == 0:
+        roots = [-b / (2 * a)]
+    else:
+        roots = []
+    vertex = (-b / (2 * a), c - b * b / (4 * a))
+    return {"roots": roots, "vertex": vertex, "y_intercept": (0, c)}
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:.2f}".rstrip("0")
+
+
+def _point_label(x, y):
+    return f"({_number(x)}, {_number(y)})"
+
+
+def graph_latex(text):
+    """The graph question text stands for, described in LaTeX by its marked points."""
+    found = features(*coefficients(text))
+    parts = []
+    if found["roots"]:
+        parts.append(r"x\text{-intercepts } " + ", ".join(_point_label(x, 0) for x in found["roots"]))
+    parts.append(r"\text{turning point } " + _point_label(*found["vertex"]))
+    parts.append(r"y\text{-intercept } " + _point_label(*found["y_intercept"]))
+    return (r"\text{Find the equation of the parabola with } " + r"\text{, }".join(parts[:-1])
+            + r"\text{ and } " + parts[-1])
+
+
+def _graph_figure():
+    """The shared figure, its axes and the artists that change between graphs."""
+    global _figure
+    if _figure is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(GRAPH_WIDTH, GRAPH_HEIGHT))
+        FigureCanvasAgg(figure)
+        axes = figure.add_axes((0.04, 0.04, 0.92, 0.92))
+        axes.set_axis_off()
+        x_axis = axes.axhline(0, color="black", linewidth=0.8)
+        y_axis = axes.axvline(0, color="black", linewidth=0.8)
+        curve, = axes.plot([], [], color="tab:blue", linewidth=1.5)
+        points, = axes.plot([], [], "o", color="black", markersize=3)
+        labels = [axes.text(0, 0, "", fontsize=7) for _ in range(MAX_LABELS)]
+        _figure = (figure, axes, x_axis, y_axis, curve, points, labels)
+    return _figure
+
+
+def render_graph(text, size=None, dpi=100):
+    """Draw the graph question text stands for and return the PNG bytes.
+
+    size is accepted so this can be used wherever mrender.render_png is, but graphs have a fixed size.
+    """
+    a, b, c = coefficients(text)
+    found = features(a, b, c)
+    # Each point with the alignment of its label: roots below the axis, the turning point on the
+    # outside of the curve and the y intercept left of the y axis, so labels do not run into each other
+    turning = "top" if a > 0 else "bottom"
+    candidates = ([((x, 0), ("left", "top" if a > 0 else "bottom")) for x in found["roots"]]
+                  + [(found["vertex"], ("center", turning)), (found["y_intercept"], ("right", "center"))])
+    marked, alignments = [], []
+    for point, alignment in candidates:
+        # A repeated root is also the turning point, and a root at 0 is also the y intercept
+        if point not in marked:
+            marked.append(point)
+            alignments.append(alignment)
+
+    # Show every marked point with some room around it
+    xs = [x for x, _ in marked]
+    left, right = min(xs) - 2, max(xs) + 2
+    grid = np.linspace(left, right, GRID_POINTS)
+    values = (a * grid + b) * grid + c
+    ys = [y for _, y in marked]
+    bottom, top = min(ys + [0]), max(ys + [0])
+    margin = max((top - bottom) * 0.15, 1)
+
+    # The figure is shared, and its labels use the same mathtext parser as mrender
+    with mrender.matplotlib_lock:
+        figure, axes, x_axis, y_axis, curve, points, labels = _graph_figure()
+        with instrument.span("graph draw"):
+            curve.set_data(grid, values)
+            points.set_data([x for x, _ in marked], [y for _, y in marked])
+            for label, (x, y), (ha, va) in zip(labels, marked, alignments):
+                label.set_visible(True)
+                label.set_position((x, y))
+                label.set_text(_point_label(x, y))
+                label.set_horizontalalignment(ha)
+                label.set_verticalalignment(va)
+            for label in labels[len(marked):]:
+                label.set_visible(False)
+            axes.set_xlim(left, right)
+            axes.set_ylim(bottom - margin, top + margin)
+            # Hide the axis lines that fall outside the view
+            x_axis.set_visible(bottom - margin <= 0 <= top + margin)
+            y_axis.set_visible(left <= 0 <= right)
+
+            buf = BytesIO()
+            figure.savefig(buf, format="png", dpi=dpi)
+    return buf.getvalue()
+
+
+def _equation_text(a, b, c):
+    return f"y = {Poly([c, b, a])}"
+
+
+def generate_graph_question(difficulty, rng=None):
+    """A parabola with integer roots from construct_quadratic, stretched and flipped when Hard."""
+    rng = rng or Crand.default_sampler()
+    difficulty, _, (x1, x2) = mgen.construct_quadratic(difficulty, rng)
+    a = rng.non_zero_randint(-3, 3) if difficulty == "Hard" else 1
+    b, c = -a * (x1 + x2), a * x1 * x2
+    return difficulty, graph_text(a, b, c), _equation_text(a, b, c)
+
+
+def graph_batch(difficulty, n, rng=None, distinct=False):
+    """n graph questions, with the roots drawn as one 3C batch."""
+    rng = Crand.sampler(rng)
+    generate = mgen.generate_distinct if distinct else mgen.generate_batch
+    batch = generate("3C", difficulty, n, rng)
+    r1, r2 = batch["r1"], batch["r2"]
+    if difficulty == "Hard":
+        a = rng.non_zero_randint(-3, 3, size=len(batch))
+    else:
+        a = np.ones_like(r1)
+    b, c = -a * (r1 + r2), a * r1 * r2
+    return [(difficulty, graph_text(*row), _equation_text(*row))
+            for row in zip(a.tolist(), b.tolist(), c.tolist())]
@@ -0,0 +1,238 @@
+"""Worker processes for topics whose generators are slow, like those that call sympy.solve.
+
+Each worker imports sympy once when it starts and then generates questions one at a time. A
+question that takes longer than the timeout cannot be interrupted, so its worker is killed, a new
+one is started and the question is drawn again from a seed derived from the original one.
+
+    pool = heavy.default_pool()
+    pool.submit(topic.generate, "Hard", seed, callback)   # callback(seed, row) on the GUI thread
+    rows = pool.generate(topic.generate, "Hard", 20, sampler)   # blocking, without an event loop
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+import Crand
+
+# Seconds a single question may take before it is given up and drawn again
+TIMEOUT = 5.0
+# Draws of one question before it is reported as failed
+MAX_ATTEMPTS = 5
+WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def redraw_seed(seed, attempt):
+    """The seed for another try at a question. Attempt 0 is the original seed."""
+    if attempt == 0:
+        return seed
+    return int(np.random.SeedSequence([seed, attempt]).generate_state(1, np.uint32)[0])
+
+
+def _worker(connection):
+    # Pay for sympy once per worker instead of on the first question, and only then take questions
+    import sympy  # noqa: F401
+    connection.send(None)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        task_id, generate, difficulty, seed = task
+        try:
+            connection.send((task_id, generate(difficulty, Crand.Sampler(seed)), None))
+        except Exception as e:
+            connection.send((task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class _Task:
+    def __init__(self, task_id, generate, difficulty, seed, callback):
+        self.task_id = task_id
+        self.generate = generate
+        self.difficulty = difficulty
+        self.seed = seed
+        self.callback = callback
+        self.attempt = 0
+        self.deadline = None
+
+    @property
+    def current_seed(self):
+        return redraw_seed(self.seed, self.attempt)
+
+
+class HeavyPool(QObject):
+    """A pool of generator processes with a timeout for every question.
+
+    Results are delivered to the GUI thread through a queued signal as each question finishes,
+    so callbacks need a running event loop. generate() works without one.
+    """
+
+    # Emitted from the dispatcher thread: callback, (seed, row) or (None, error message)
+    _finished = pyqtSignal(object, object)
+
+    def __init__(self, workers=WORKERS, timeout=TIMEOUT, parent=None):
+        super().__init__(parent)
+        self.workers = workers
+        self.timeout = timeout
+        self.timeouts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._waiting = []  # tasks not yet handed to a worker
+        self._busy = {}  # connection -> (process, task)
+        self._idle = []  # (process, connection)
+        self._starting = {}  # connection -> process, until the worker has imported sympy
+        self._next_id = 0
+        self._stopping = False
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._finished.connect(self._deliver, Qt.ConnectionType.QueuedConnection)
+        for _ in range(workers):
+            self._start_worker()
+        self._thread = threading.Thread(target=self._dispatch, name="heavy-dispatch", daemon=True)
+        self._thread.start()
+
+    def _start_worker(self):
+        parent_end, child_end = self._context.Pipe()
+        process = self._context.Process(target=_worker, args=(child_end,), daemon=True)
+        process.start()
+        child_end.close()
+        self._starting[parent_end] = process
+
+    def submit(self, generate, difficulty, seed, callback, direct=False):
+        """Generate one question with generate(difficulty, sampler) in a worker.
+
+        callback(seed, row) gets the seed that was finally used, or (None, message) if every
+        attempt failed. It runs on the GUI thread, or on the dispatcher thread with direct=True.
+        """
+        with self._lock:
+            self._next_id += 1
+            task = _Task(self._next_id, generate, difficulty, seed, (callback, direct))
+            self._waiting.append(task)
+        self._wake_writer.send(None)
+        return task.task_id
+
+    def generate(self, generate, difficulty, n, rng=None):
+        """n questions as (difficulty, question, answer) rows, blocking until they are all done."""
+        rng = Crand.sampler(rng)
+        results = queue.Queue()
+        for index in range(n):
+            seed = rng.randint(0, 2 ** 32 - 1)
+            self.submit(generate, difficulty, seed, lambda seed, row, index=index: results.put((index, seed, row)),
+                        direct=True)
+        rows = [None] * n
+        for _ in range(n):
+            index, seed, row = results.get()
+            if seed is None:
+                raise RuntimeError(row)
+            rows[index] = row
+        return rows
+
+    def _deliver(self, callback, result):
+        callback(*result)
+
+    def _finish(self, task, seed, row):
+        callback, direct = task.callback
+        if direct:
+            callback(seed, row)
+        else:
+            self._finished.emit(callback, (seed, row))
+
+    def _dispatch(self):
+        while not self._stopping:
+            with self._lock:
+                while self._waiting and self._idle:
+                    process, connection = self._idle.pop()
+                    task = self._waiting.pop(0)
+                    task.deadline = time.monotonic() + self.timeout
+                    connection.send((task.task_id, task.generate, task.difficulty, task.current_seed))
+                    self._busy[connection] = (process, task)
+                busy = list(self._busy)
+
+            deadlines = [task.deadline for _, task in self._busy.values()]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for connection in wait(busy + list(self._starting) + [self._wake_reader], wait_for):
+                if connection is self._wake_reader:
+                    self._wake_reader.recv()
+                    continue
+                if connection in self._starting:
+                    process = self._starting.pop(connection)
+                    try:
+                        connection.recv()
+                        self._idle.append((process, connection))
+                    except EOFError:
+                        connection.close()
+                        if not self._stopping:
+                            self._start_worker()
+                    continue
+                process, task = self._busy.pop(connection)
+                try:
+                    _, row, error = connection.recv()
+                except EOFError:
+                    # The worker died, treat it like a timeout
+                    self._retry(process, connection, task)
+                    continue
+                self._idle.append((process, connection))
+                if error is None:
+                    self._finish(task, task.current_seed, row)
+                else:
+                    self._finish(task, None, error)
+
+            now = time.monotonic()
+            for connection, (process, task) in list(self._busy.items()):
+                if task.deadline <= now:
+                    del self._busy[connection]
+                    self.timeouts += 1
+                    self._retry(process, connection, task)
+
+    def _retry(self, process, connection, task):
+        """Replace a worker that is stuck or dead, and draw its question again."""
+        process.kill()
+        process.join()
+        connection.close()
+        if not self._stopping:
+            self._start_worker()
+        task.attempt += 1
+        if task.attempt >= MAX_ATTEMPTS:
+            self._finish(task, None, f"No question after {MAX_ATTEMPTS} attempts of {self.timeout}s")
+        else:
+            with self._lock:
+                self._waiting.insert(0, task)
+
+    def shutdown(self):
+        self._stopping = True
+        self._wake_writer.send(None)
+        self._thread.join()
+        stopping = self._idle + [(process, None) for process, _ in self._busy.values()]
+        stopping += [(process, None) for process in self._starting.values()]
+        for process, connection in stopping:
+            if connection is not None:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+
+
+_default_pool = None
+
+
+def default_pool():
+    """The pool shared by the GUI, started on first use."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = HeavyPool()
+    return _default_pool
+
+
+def shutdown():
+    """Stop the shared pool's workers, if it was started."""
+    global _default_pool
+    if _default_pool is not None:
+        _default_pool.shutdown()
+        _default_pool = None
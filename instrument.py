@@ -0,0 +1,158 @@
+"""Timing spans around the slow parts of the program.
+
+    with instrument.span("render"):
+        ...
+
+Spans cost almost nothing while timing is off. Turn it on with the SAT_TRACE environment variable
+or Tools > Record Timings. The count, total and worst time of every span are kept, shown in the
+status bar and written as JSON to SAT_TRACE_FILE (sat_trace.json by default) on exit.
+
+For a closer look at one operation, profile_next(name) (or SAT_PROFILE=name, or Tools > Profile Next
+Question) runs the next profiled(name) block under cProfile.
+"""
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+TRACE_FILE = os.environ.get("SAT_TRACE_FILE", "sat_trace.json")
+
+_enabled = bool(os.environ.get("SAT_TRACE"))
+_lock = threading.Lock()
+_stats = {}  # span name -> [count, total seconds, max seconds]
+_profile_next = os.environ.get("SAT_PROFILE")  # name of the operation to profile next time profiled() runs
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager that times its block under name, if timing is on."""
+    return _Span(name) if _enabled else _NO_SPAN
+
+
+def record(name, seconds):
+    """Add one timing. Safe to call from any thread."""
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def stats():
+    """Aggregated timings in milliseconds, keyed by span name."""
+    with _lock:
+        return {name: {"count": count, "total_ms": total * 1000, "mean_ms": total / count * 1000,
+                       "max_ms": worst * 1000}
+                for name, (count, total, worst) in _stats.items()}
+
+
+def summary(limit=3):
+    """The spans that took the longest in total, short enough for the status bar."""
+    top = sorted(stats().items(), key=lambda pair: pair[1]["total_ms"], reverse=True)[:limit]
+    if not top:
+        return "Timings: nothing recorded"
+    return "Timings: " + ", ".join(f"{name} {entry['total_ms']:.0f} ms / {entry['count']}" for name, entry in top)
+
+
+def write_trace(path=None):
+    """Write the aggregated timings as JSON. Returns the path written."""
+    path = path or TRACE_FILE
+    with open(path, "w") as f:
+        json.dump({"spans": stats()}, f, indent=1, sort_keys=True)
+    return path
+
+
+@atexit.register
+def _write_on_exit():
+    if _enabled and _stats:
+        try:
+            write_trace()
+        except OSError as e:
+            print(f"Could not write timings: {e}")
+
+
+def profile_next(name):
+    """Run the next profiled(name) block under cProfile."""
+    global _profile_next
+    _profile_next = name
+
+
+class profiled:
+    """Context manager that profiles its block if profile_next(name) asked for it.
+
+    The stats are written to sat_profile_<name>.prof for snakeviz or pstats, and the top entries
+    are printed.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.profiler = None
+        self.path = None
+
+    def __enter__(self):
+        global _profile_next
+        if _profile_next == self.name:
+            _profile_next = None
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.disable()
+            path = f"sat_profile_{self.name.replace(' ', '_')}.prof"
+            self.profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            print(f"Profile of {self.name} written to {path}")
+            print(out.getvalue())
+            self.path = path
+        return False
@@ -1,39 +1,103 @@
+import time
+
+# Taken before anything else is imported, for --startup-time
+_START = time.perf_counter()
+
+import importlib.util
+import os
+import sys
+from contextlib import contextmanager
+
 from PyQt6.QtWidgets import *
-from PyQt6.uic import loadUi
-from PyQt6.QtGui import QPainter, QImage, QPixmap, QIntValidator
-from PyQt6.QtPrintSupport import QPrinter
-from PyQt6.QtGui import QPageSize
-from PyQt6.QtWidgets import QGraphicsTextItem
-from PyQt6.QtCore import Qt, QPointF
-import mgen
-import random
-from PyQt6.QtWidgets import QGraphicsPixmapItem
-from PyQt5.QtGui import QImage, QPixmap
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-import io
-from PyQt6.QtCore import QPointF
-from PyQt6.QtWidgets import QGraphicsPixmapItem, QDialog, QVBoxLayout, QLabel, QPushButton
-from matplotlib import pyplot as plt
-from io import BytesIO
-from PyQt6.QtGui import QPixmap
+from PyQt6 import uic
+from PyQt6.QtGui import QIntValidator, QPagedPaintDevice, QPicture, QPixmap, QFont
+from PyQt6.QtCore import Qt, QPointF, QRectF, QSize, QTimer
+import Crand
+import heavy
+import instrument
+import mrender
+import pdfexport
+import project
+import textexport
+import topics
+from pagelayout import ShelfLayout
+from pages import PageList, PageScene, page_changed, performance_mode, set_performance_mode
+
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+# Where compiled .ui files are kept, the first one that can be written to is used
+UI_CACHE_DIRS = (os.path.join(UI_DIR, "__pycache__"), os.path.join(os.path.expanduser("~"), ".cache", "SAT-1", "ui"))
+
+PROJECT_FILTER = "SAT projects (*.satp)"
+TEX_FILTER = "LaTeX files (*.tex)"
+HTML_FILTER = "HTML files (*.html)"
+
+
+def _compile_ui(source, target):
+    """Compile a .ui file to Python at target, unless it is already there and up to date."""
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Heavy topic workers import this module too, so several processes may compile at once
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(source) as ui_file, open(tmp_path, "w") as py_file:
+            uic.compileUi(ui_file, py_file)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compiled_ui(name):
+    """Form class for a .ui file next to this module.
+
+    Parsing the XML with loadUi on every start is slow, so the file is compiled to Python once, kept
+    in the first of UI_CACHE_DIRS that can be written to and compiled again only when the .ui file
+    changes. If none can, as in a read-only install, the XML is parsed every time.
+    """
+    source = os.path.join(UI_DIR, name)
+    module_name = "ui_" + os.path.splitext(name)[0]
+    for cache_dir in UI_CACHE_DIRS:
+        target = os.path.join(cache_dir, module_name + ".py")
+        try:
+            _compile_ui(source, target)
+        except OSError:
+            continue
+        spec = importlib.util.spec_from_file_location(module_name, target)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return next(value for key, value in vars(module).items() if key.startswith("Ui_"))
+    return uic.loadUiType(source)[0]
+
 
 class EditableTextItem(QGraphicsPixmapItem):
     def __init__(self, equation_type, difficulty, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setFlag(QGraphicsPixmapItem.GraphicsItemFlag.ItemIsMovable)
         self.setFlag(QGraphicsPixmapItem.GraphicsItemFlag.ItemIsSelectable)
+        self.setFlag(QGraphicsPixmapItem.GraphicsItemFlag.ItemSendsGeometryChanges)
         self.text = ""
         self.equation_type = equation_type  # Store the equation type
         self.difficulty = difficulty  # Store the difficulty level
         self.drag_offset = QPointF(0, 0)  # Store the offset of the mouse click
+        self.drag_target = None  # Latest drag position not applied yet, in performance mode
         self.answer = ""  # Add 'answer' attribute here
+        self.seed = None  # Seed of the draw the question came from
+        self.released_size = None  # Size of the pixmap while it is released to save memory
+        self.number_label = None  # Question number shown to the left of the equation
+        self.number_gutter = 40
+        self.on_resized = None  # Called with the item when its rendered size changes
+        self.render = topics.renderer(equation_type)  # How to draw questions that are not mathtext
+        self.print_image = None  # (text, QImage) of the graph as printed
 
     def mouseDoubleClickEvent(self, event):
         try:
             # Create a dialog for input
             dialog = QDialog()
-            dialog.setWindowTitle(self.equation_type)  # Set the title to the equation type
+            # Set the title to the equation type
+            dialog.setWindowTitle(topics.TOPICS[self.equation_type].label
+                                  if self.equation_type in topics.TOPICS else self.equation_type)
             layout = QVBoxLayout()
 
             # Create labels for the question, answer, and difficulty
@@ -63,65 +127,203 @@ class EditableTextItem(QGraphicsPixmapItem):
         try:
             # Store the offset of the mouse click relative to the top-left corner of the box
             self.drag_offset = event.pos() - self.boundingRect().topLeft()
+            if performance_mode() and isinstance(self.scene(), PageScene):
+                self.scene().cache_items(True)
             super().mousePressEvent(event)
         except Exception as e:
             print(e)
 
+    def mouseReleaseEvent(self, event):
+        self._apply_drag()
+        if isinstance(self.scene(), PageScene):
+            self.scene().cache_items(False)
+        super().mouseReleaseEvent(event)
+
     def mouseMoveEvent(self, event):
         if self.isSelected():
             new_pos = event.scenePos() - self.drag_offset
-            self.setPos(new_pos)
+            if performance_mode():
+                # Mouse moves can come faster than frames, only move to the latest one each pass
+                if self.drag_target is None:
+                    QTimer.singleShot(0, self._apply_drag)
+                self.drag_target = new_pos
+            else:
+                self.setPos(new_pos)
         else:
             super().mouseMoveEvent(event)
 
+    def _apply_drag(self):
+        if self.drag_target is not None:
+            self.setPos(self.drag_target)
+            self.drag_target = None
+
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
+            page_changed(self)
+        return super().itemChange(change, value)
 
     def setPlainText(self, text):
         self.text = text
-        fig = plt.figure(figsize=(6, 5))  # Adjust the figure size here
-
-        text_obj = plt.text(0, 0, f'${text}$', size=20, ha='center', va='center')  # Align text to the left
-        plt.axis('off')
-
-        renderer = fig.canvas.get_renderer()
-        bbox = text_obj.get_window_extent(renderer)
-
-        # Adjust the figure size to make the bounding box slightly bigger
-        fig.set_size_inches(bbox.width / renderer.dpi * 0.5, bbox.height / renderer.dpi * 0.5)
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')  # Remove padding around the figure
-        plt.close(fig)
-        buf.seek(0)
-
-        pixmap = QPixmap()
-        pixmap.loadFromData(buf.read())
+        page_changed(self)
+        # Show a placeholder while the equation renders in the background. Rendered equations are
+        # shared through the cache, so the same expression is only drawn once.
+        self.setPixmap(mrender.placeholder_pixmap())
+        mrender.default_pool().request(text, lambda pixmap: self._set_rendered(text, pixmap), render=self.render)
+
+    def _set_rendered(self, text, pixmap):
+        # Ignore late results if the text was changed while rendering
+        if text == self.text:
+            old_size = self.size()
+            self.released_size = None
+            self.setPixmap(pixmap)
+            if pixmap.size() != old_size:
+                page_changed(self)
+                self._place_number()
+                if self.on_resized is not None:
+                    self.on_resized(self)
+
+    def setPending(self, text):
+        """Set the equation and show the placeholder, leaving the rendering to the caller."""
+        self.text = text
+        page_changed(self)
+        self.setPixmap(mrender.placeholder_pixmap())
+
+    def setRendered(self, text, pixmap):
+        """Show a pixmap rendered for text, unless the text has changed since.
+
+        Unlike a single render this does not call on_resized, the caller moves the items once for
+        the whole batch.
+        """
+        if text != self.text:
+            return
+        old_size = self.size()
+        self.released_size = None
         self.setPixmap(pixmap)
+        if pixmap.size() != old_size:
+            page_changed(self)
+            self._place_number()
 
-class SelectableGraphicsView(QGraphicsView):
-    def __init__(self, scene, parent=None):
-        super().__init__(scene, parent)
-        self.setRenderHint(QPainter.RenderHint.Antialiasing)
-        self.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+    def setReleased(self, text, size):
+        """Set the equation without rendering it, it is loaded when its page is first shown."""
+        self.text = text
+        self.released_size = size
+        self.setPixmap(QPixmap())
+        page_changed(self)
+
+    def setNumber(self, number, gutter=40):
+        """Show the question number in the gutter to the left of the equation."""
+        if self.number_label is None:
+            self.number_label = QGraphicsSimpleTextItem(self)
+            self.number_label.setFont(QFont("Sans Serif", 12))
+        elif self.number_label.text() == f"{number}." and self.number_gutter == gutter:
+            # Unchanged, leave the page clean so it is not exported again
+            return
+        self.number_label.setText(f"{number}.")
+        self.number_gutter = gutter
+        page_changed(self)
+        self._place_number()
+
+    def _place_number(self):
+        if self.number_label is not None:
+            # The number keeps its size and gutter when the equation is scaled down
+            scale = self.scale()
+            self.number_label.setScale(1 / scale)
+            label_height = self.number_label.boundingRect().height() / scale
+            self.number_label.setPos(-self.number_gutter / scale, (self.size().height() - label_height) / 2)
+
+    def fit_width(self, width):
+        """Scale the equation down if it is wider than width. Returns its size on the page."""
+        size = self.size()
+        scale = min(1.0, width / size.width()) if size.width() else 1.0
+        if scale != self.scale():
+            self.setScale(scale)
+            self.setTransformationMode(Qt.TransformationMode.SmoothTransformation if scale < 1
+                                       else Qt.TransformationMode.FastTransformation)
+            self._place_number()
+            page_changed(self)
+        return size.width() * scale, size.height() * scale
+
+    def pixmap_bytes(self):
+        return mrender.pixmap_bytes(self.pixmap())
+
+    def release_pixmap(self):
+        """Drop the pixmap while the page is off screen, keeping the item's size."""
+        if self.released_size is None and self.text:
+            self.released_size = self.pixmap().size()
+            self.setPixmap(QPixmap())
+
+    def restore_pixmap(self):
+        if self.released_size is not None:
+            mrender.default_pool().request(self.text, lambda pixmap: self._set_rendered(self.text, pixmap),
+                                           render=self.render)
+
+    def size(self):
+        """Size of the equation, whether or not its pixmap is currently held."""
+        return self.released_size if self.released_size is not None else self.pixmap().size()
+
+    def boundingRect(self):
+        if self.released_size is not None:
+            return QRectF(0, 0, self.released_size.width(), self.released_size.height())
+        return super().boundingRect()
+
+    def paint(self, painter, option, widget=None):
+        try:
+            self._paint(painter, option, widget)
+        except Exception as e:
+            # An exception escaping paint aborts the program, show the screen pixmap instead
+            print(f"Could not paint {self.text!r}: {e}")
+            super().paint(painter, option, widget)
+
+    def _paint(self, painter, option, widget):
+        # When printing or recording, draw the equation as vector outlines instead of the screen pixmap
+        if self.text and self.render is not None and isinstance(painter.device(), (QPagedPaintDevice, QPicture)):
+            # Graphs have no vector form, print them from a high resolution render instead. Pictures
+            # are played on the PDF writer thread, where only a QImage may be used, not a QPixmap
+            if self.print_image is None or self.print_image[0] != self.text:
+                cache = mrender.default_cache()
+                pixmap = cache.get(self.text, dpi=mrender.PRINT_DPI)
+                if pixmap is None:
+                    pixmap = cache.put(self.text, self.render(self.text, mrender.FONT_SIZE, mrender.PRINT_DPI),
+                                       dpi=mrender.PRINT_DPI)
+                self.print_image = (self.text, pixmap.toImage())
+            image = self.print_image[1]
+            target = QRectF(0, 0, self.size().width(), self.size().height())
+            painter.drawImage(target, image, QRectF(image.rect()))
+        elif self.text and isinstance(painter.device(), (QPagedPaintDevice, QPicture)):
+            path = mrender.math_path(self.text)
+            # Centre the outlines where the pixmap is shown on screen
+            width, height = mrender.path_size(path)
+            offset = QPointF((self.size().width() - width) / 2, (self.size().height() - height) / 2)
+            painter.fillPath(path.translated(offset), Qt.GlobalColor.black)
+        else:
+            super().paint(painter, option, widget)
 
-    def mouseDoubleClickEvent(self, event):
-        # Deselect all other views
-        for view in self.parent().findChildren(SelectableGraphicsView):
-            if view != self:
-                view.setStyleSheet("")
+class AnswerItem(EditableTextItem):
+    """The typeset answer of a question, shown on the answer pages under the question's number."""
 
-        # Draw a blue rectangle around the view
-        self.setStyleSheet("border: 2px solid blue")
+    def __init__(self, question, *args, **kwargs):
+        super().__init__(question.equation_type, question.difficulty, *args, **kwargs)
+        self.question = question
+        self.answer = question.answer
+        # Answers are always mathtext, even when the question is a graph
+        self.render = None
 
-        # Update the selectedPage in the parent (MyGui)
-        self.parent().selectedPage = self  # Update this line
+    def answer_text(self):
+        """The answer as produced by the generator, formatted by the question's topic."""
+        topic = topics.TOPICS.get(self.equation_type)
+        return topic.format_answer(self.answer) if topic is not None else topics.answer_text(self.answer)
 
-        # Call the superclass implementation
-        super().mouseDoubleClickEvent(event)
 
 class DraggableTextItem(QGraphicsTextItem):
     def __init__(self, text, parent=None):
         super().__init__(text, parent)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges)
+
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
+            page_changed(self)
+        return super().itemChange(change, value)
 
     def mousePressEvent(self, event):
         self.setCursor(Qt.CursorShape.ClosedHandCursor)
@@ -135,10 +337,46 @@ class DraggableTextItem(QGraphicsTextItem):
         self.setCursor(Qt.CursorShape.OpenHandCursor)
         super().mouseReleaseEvent(event)
 
-class MyGui(QMainWindow):
+class QuestionDialog(QDialog, compiled_ui("questiondialog.ui")):
+    """The add question dialog. One is created and reused for every topic."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setupUi(self)
+        self.topic = None
+
+        # Set validator for numofqueLine
+        validator = QIntValidator(0, 99)  # Allow numbers from 0 to 99
+        self.numofqueLine.setValidator(validator)
+
+        # Add the buttons to a group, so that one of them is always checked
+        self.button_group = QButtonGroup(self)
+        self.button_group.addButton(self.easyButton)
+        self.button_group.addButton(self.mediumButton)
+        self.button_group.addButton(self.hardButton)
+        self.button_group.setExclusive(True)
+
+        # Set easyButton as the default checked button
+        self.easyButton.setChecked(True)
+
+    def count(self):
+        """Number of questions to add, one if numofqueLine is left empty."""
+        text = self.numofqueLine.text()
+        return int(text) if text else 1
+
+    def difficulty(self):
+        # Get the selected difficulty level
+        if self.easyButton.isChecked():
+            return "Easy"
+        elif self.mediumButton.isChecked():
+            return "Medium"
+        return "Hard"
+
+
+class MyGui(QMainWindow, compiled_ui("main.ui")):
     def __init__(self):
         super().__init__()
-        loadUi('main.ui', self)
+        self.setupUi(self)
 
         self.scrollArea = self.findChild(QScrollArea, 'scrollArea')
         self.scrollAreaAnswers = self.findChild(QScrollArea, 'scrollAreaAnswers')
@@ -150,11 +388,41 @@ class MyGui(QMainWindow):
         self.tabWidget.currentChanged.connect(self.on_tab_changed)
 
         self.actionPDF.triggered.connect(self.save_pdf)
+        self.actionTeX.triggered.connect(lambda: self.export_text("worksheet.tex", TEX_FILTER))
+        self.actionHTML.triggered.connect(lambda: self.export_text("worksheet.html", HTML_FILTER))
+        self.actionSave.triggered.connect(self.save_project)
+        self.actionOpen.triggered.connect(self.open_project)
+        self.actionRecordTimings.setChecked(instrument.enabled())
+        self.actionRecordTimings.toggled.connect(self.record_timings)
+        self.actionProfileNext.triggered.connect(lambda: instrument.profile_next("add question"))
+        self.actionPerformanceMode.setChecked(performance_mode())
+        self.actionPerformanceMode.toggled.connect(self.set_performance_mode)
+        mrender.default_pool().failed.connect(self.render_failed)
+
+        # The project file the document was opened from or last saved to
+        self.projectPath = None
+        self.openedProject = None
 
         self.introPageWidget = QWidget()
-        # Initialize the page counts
-        self.questionPageCount = 0
-        self.answerPageCount = 0
+
+        # Each tab keeps its pages in a PageList, which only creates views for the pages on screen
+        self.titlePages = PageList(self.scrollAreaTitlePage, self.scrollAreaTitlePageWidgetContents, parent=self)
+        self.questionPages = PageList(self.scrollArea, self.scrollAreaWidgetContents, parent=self)
+        self.answerPages = PageList(self.scrollAreaAnswers, self.scrollAreaAnswersWidgetContents, parent=self)
+        self.selectedPage = None
+        for page_list in (self.titlePages, self.questionPages, self.answerPages):
+            page_list.pageSelected.connect(self.on_page_selected)
+
+        # Questions in worksheet order, flowed onto the question pages by the layout engine
+        self.questionItems = []
+        self.questionLayout = ShelfLayout()
+
+        # The answer to every question, in the same order, flowed onto the answer pages
+        self.answerItems = []
+        self.answerLayout = ShelfLayout(columns=2)
+
+        # Created the first time a question is added
+        self.questionDialog = None
 
         self.addPage.clicked.connect(lambda: self.add_question_page(self.scrollAreaWidgetContents))
         self.deletePage.clicked.connect(self.delete_page)
@@ -168,26 +436,16 @@ class MyGui(QMainWindow):
         self.add_answer_page(self.scrollAreaAnswersWidgetContents)
 
         # Select the first page
-        selectedPage = self.scrollAreaWidgetContents.layout().itemAt(0).widget()
-        selectedPage.setStyleSheet("border: 2px solid blue")
+        self.questionPages.select(self.questionPages[0])
 
         self.searchMathEquations.textChanged.connect(self.search_equations)
 
         self.mathQuestions.itemDoubleClicked.connect(self.add_equation)
-        self.equations = [r"Chapter 3: Quadratics",
-                          "  3A Expanding and collecting like terms",
-                          "  3B Factorising",
-                          "  3C Quadratic Equations",
-                          "  3D Graphing Quadratics",
-                          "  3F Completing The Square And Turning Points",
-                          "  3G Solving Quadratic Inequalities",
-                          "  3H The General Quadratic Formula",
-                          "  3I The Discriminant",
-                          "  3J Solving Simultaneous Linear and Quadratic Equations",
-                          "  3K Families of Quadratic Polynomial Functions",
-                          "  3L Quadratic Models"]
-        for equation in self.equations:
-            QListWidgetItem(equation, self.mathQuestions)
+        QListWidgetItem(topics.CHAPTER, self.mathQuestions)
+        for topic in topics.TOPICS.values():
+            # The code is kept with the item, the label is only for show
+            list_item = QListWidgetItem(f"  {topic.label}", self.mathQuestions)
+            list_item.setData(Qt.ItemDataRole.UserRole, topic.code)
 
     def search_equations(self):
         # Get the text from the QLineEdit
@@ -203,53 +461,28 @@ class MyGui(QMainWindow):
             else:
                 item.setHidden(True)
 
-    def intro_page(self, scrollAreaTitlePageWidgetContents):
-        # Create a QGraphicsScene and a SelectableGraphicsView for this page
-        self.scene_intro = QGraphicsScene()  # Make scene an attribute of MyGui
-        view = SelectableGraphicsView(self.scene_intro, self)
-
-        # Set the size to A4 dimensions (in pixels at 96 DPI)
-        view.setFixedSize(794, 1150)
-        self.scene_intro.setSceneRect(0, 0, 794, 1123)
-
-        view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-        # Set the QGraphicsView to expand and fill the available space
-        view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-
-        # Create a layout for the scrollAreaTitlePageWidgetContents if it doesn't have one
-        if scrollAreaTitlePageWidgetContents.layout() is None:
-            scrollAreaTitlePageWidgetContents.setLayout(QVBoxLayout())
-            scrollAreaTitlePageWidgetContents.layout().setAlignment(Qt.AlignmentFlag.AlignCenter)  # Center the layout
-
-        # Add the QGraphicsView to the layout
-        scrollAreaTitlePageWidgetContents.layout().addWidget(view)
-        view.setObjectName(f"Title Page")
+    @property
+    def questionPageCount(self):
+        return len(self.questionPages)
 
-    def add_question_page(self, scrollAreaAnswers):
-        # Create a QGraphicsScene and a SelectableGraphicsView for this page
-        self.scene_questions = QGraphicsScene()  # Make scene an attribute of MyGui
-        view = SelectableGraphicsView(self.scene_questions, self)
+    @property
+    def answerPageCount(self):
+        return len(self.answerPages)
 
+    def new_page_scene(self):
         # Set the size to A4 dimensions (in pixels at 96 DPI)
-        view.setFixedSize(794, 1150)
-        self.scene_questions.setSceneRect(0, 0, 794, 1123)
-
-        # Hide the scrollbars
-        view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        scene = PageScene()
+        scene.setSceneRect(0, 0, 794, 1123)
+        return scene
 
-        # Set the QGraphicsView to expand and fill the available space
-        view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-
-        # Create a layout for the scrollArea if it doesn't have one
-        if scrollAreaAnswers.layout() is None:
-            scrollAreaAnswers.setLayout(QVBoxLayout())
-            scrollAreaAnswers.layout().setAlignment(Qt.AlignmentFlag.AlignCenter)  # Center the layout
+    def intro_page(self, scrollAreaTitlePageWidgetContents):
+        # Create a QGraphicsScene for this page, its view is created when it is shown
+        self.scene_intro = self.new_page_scene()  # Make scene an attribute of MyGui
+        self.titlePages.add_page(self.scene_intro, "Title Page")
 
-        # Add the QGraphicsView to the layout
-        scrollAreaAnswers.layout().addWidget(view)
+    def add_question_page(self, scrollAreaAnswers):
+        # Create a QGraphicsScene for this page, its view is created when it is shown
+        self.scene_questions = self.new_page_scene()  # Make scene an attribute of MyGui
 
         # Create a QGraphicsTextItem for the page number
         pageNumberLabel = DraggableTextItem(f"Page {self.questionPageCount + 2}")  # Set the page number
@@ -262,238 +495,482 @@ class MyGui(QMainWindow):
         # Set the position of the pageNumberLabel
         pageNumberLabel.setPos(x, y)
 
-        # Set the object name to "Page " followed by the page number
-        view.setObjectName(f"Page {self.questionPageCount + 2}")
-
-        self.questionPageCount += 1
+        # Name the page "Page " followed by the page number
+        return self.questionPages.add_page(self.scene_questions, f"Page {self.questionPageCount + 2}")
 
     def add_answer_page(self, scrollAreaAnswers):
-        # Create a QGraphicsScene and a SelectableGraphicsView for this page
-        self.scene_answers = QGraphicsScene()  # Make scene an attribute of MyGui
-        view = SelectableGraphicsView(self.scene_answers, self)
-
-        # Set the size to A4 dimensions (in pixels at 96 DPI)
-        view.setFixedSize(794, 1150)
-        self.scene_answers.setSceneRect(0, 0, 794, 1123)
-
-        view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-        # Set the QGraphicsView to expand and fill the available space
-        view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        # Create a QGraphicsScene for this page, its view is created when it is shown
+        self.scene_answers = self.new_page_scene()  # Make scene an attribute of MyGui
+        return self.answerPages.add_page(self.scene_answers, f"Answer Page {self.answerPageCount + 1}")
+
+    def add_questions(self, items, render=True):
+        """Append question items to the worksheet and flow them and their answers onto the pages.
+
+        Without render the answers only get placeholders, and the new answer items are returned so
+        the caller can render them.
+        """
+        start = answer_start = len(self.questionItems)
+        answers = []
+        for item in items:
+            item.on_resized = self.question_resized
+            self.questionItems.append(item)
+            start = min(start, self.questionLayout.append(self.item_size(item)))
+
+            answer = self.new_answer(item)
+            if render:
+                answer.setPlainText(answer.answer_text())
+            else:
+                answer.setPending(answer.answer_text())
+            self.answerItems.append(answer)
+            answers.append(answer)
+            answer_start = min(answer_start, self.answerLayout.append(self.item_size(answer)))
+        self.place_questions(start)
+        self.place_answers(answer_start)
+        return answers
+
+    @contextmanager
+    def updates_suspended(self):
+        """Keep the pages from repainting while many items are added, they repaint once at the end."""
+        contents = (self.scrollAreaWidgetContents, self.scrollAreaAnswersWidgetContents)
+        for widget in contents:
+            widget.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            for widget in contents:
+                widget.setUpdatesEnabled(True)
+
+    def new_answer(self, question):
+        # The answer comes from the generator, nothing is solved again here
+        answer = AnswerItem(question)
+        answer.on_resized = self.answer_resized
+        return answer
+
+    def remove_question(self, item):
+        index = self.questionItems.index(item)
+        for items, layout, place in ((self.questionItems, self.questionLayout, self.place_questions),
+                                     (self.answerItems, self.answerLayout, self.place_answers)):
+            removed = items.pop(index)
+            removed.on_resized = None
+            if removed.scene() is not None:
+                removed.scene().removeItem(removed)
+            place(layout.remove(index))
+
+    def question_resized(self, item):
+        # The real equation replaced its placeholder, move everything after it if the size changed
+        index = self.questionItems.index(item)
+        self.place_questions(self.questionLayout.resize(index, self.item_size(item)))
+
+    def answer_resized(self, item):
+        index = self.answerItems.index(item)
+        self.place_answers(self.answerLayout.resize(index, self.item_size(item)))
+
+    def item_size(self, item):
+        # Both layouts share the page size, so either gives the widest an item may be
+        return item.fit_width(self.questionLayout.max_item_width)
+
+    def place_questions(self, start):
+        """Move the questions from start onward to where the layout puts them, adding pages as needed."""
+        self.place_items(self.questionItems, self.questionLayout, self.questionPages,
+                         lambda: self.add_question_page(self.scrollAreaWidgetContents), start)
+
+    def place_answers(self, start):
+        """Move the answers from start onward, then drop answer pages that are no longer needed."""
+        self.place_items(self.answerItems, self.answerLayout, self.answerPages,
+                         lambda: self.add_answer_page(self.scrollAreaAnswersWidgetContents), start)
+        while self.answerPageCount > max(1, self.answerLayout.page_count):
+            removed = self.answerPages.remove_last()
+            if removed.selected:
+                self.answerPages.select(self.answerPages[-1])
+
+    def place_items(self, items, layout, pages, add_page, start):
+        for index in range(start, len(items)):
+            item = items[index]
+            placement = layout.placements[index]
+            while placement.page >= len(pages):
+                add_page()
+            scene = pages[placement.page].scene()
+            if item.scene() is not scene:
+                if item.scene() is not None:
+                    item.scene().removeItem(item)
+                scene.addItem(item)
+            item.setPos(placement.x, placement.y)
+            item.setNumber(placement.number, layout.number_width)
+
+    def clear_questions(self):
+        """Remove every question and all but the first question and answer page."""
+        for item in self.questionItems:
+            item.on_resized = None
+            if item.scene() is not None:
+                item.scene().removeItem(item)
+        for item in self.answerItems:
+            item.on_resized = None
+            if item.scene() is not None:
+                item.scene().removeItem(item)
+        self.questionItems = []
+        self.questionLayout = ShelfLayout()
+        self.answerItems = []
+        self.answerLayout = ShelfLayout(columns=2)
+        for page_list in (self.questionPages, self.answerPages):
+            while len(page_list) > 1:
+                page_list.remove_last()
+        self.openedProject = None
+
+    def question_record(self, item, answer):
+        """What a project file stores about a question and its answer."""
+        page = next(i for i, slot in enumerate(self.questionPages) if slot.scene() is item.scene())
+        size = item.size()
+        answer_size = answer.size()
+        return {"topic": item.equation_type, "difficulty": item.difficulty, "text": item.text,
+                "answer": item.answer, "seed": item.seed, "page": page, "x": item.x(), "y": item.y(),
+                "width": size.width(), "height": size.height(),
+                "answer_width": answer_size.width(), "answer_height": answer_size.height()}
+
+    def save_project(self):
+        try:
+            path = self.projectPath
+            if path is None:
+                path, _ = QFileDialog.getSaveFileName(self, "Save Project", "worksheet.satp", PROJECT_FILTER)
+                if not path:
+                    return
+
+            # Embed the rendered equations, taking those of pages never shown from the opened file
+            texts = {item.text for item in self.questionItems + self.answerItems}
+            renders = project.cached_renders(texts)
+            if self.openedProject is not None:
+                renders.update(self.openedProject.renders(texts - renders.keys()))
+
+            pages = {"title": len(self.titlePages), "questions": self.questionPageCount,
+                     "answers": self.answerPageCount}
+            questions = [self.question_record(item, answer) for item, answer in zip(self.questionItems, self.answerItems)]
+            project.save(path, pages, questions, renders)
+            self.projectPath = path
+            self.openedProject = project.load(path)
+            self.statusbar.showMessage(f"Saved {path}")
+        except Exception as e:
+            print(e)
 
-        # Create a layout for the scrollAreaAnswers if it doesn't have one
-        if scrollAreaAnswers.layout() is None:
-            scrollAreaAnswers.setLayout(QVBoxLayout())
-            scrollAreaAnswers.layout().setAlignment(Qt.AlignmentFlag.AlignCenter)  # Center the layout
+    def open_project(self):
+        try:
+            path, _ = QFileDialog.getOpenFileName(self, "Open Project", "", PROJECT_FILTER)
+            if not path:
+                return
+            opened = project.load(path)
+
+            self.clear_questions()
+            while self.questionPageCount < opened.pages["questions"]:
+                self.add_question_page(self.scrollAreaWidgetContents)
+            while self.answerPageCount < opened.pages["answers"]:
+                self.add_answer_page(self.scrollAreaAnswersWidgetContents)
+
+            # Items are created without their images, those are loaded when a page is first shown
+            sizes = []
+            for question in opened.questions:
+                item = EditableTextItem(question["topic"], question["difficulty"])
+                item.setReleased(question["text"], QSize(question["width"], question["height"]))
+                item.answer = question["answer"]
+                item.seed = question["seed"]
+                item.on_resized = self.question_resized
+                self.questionItems.append(item)
+                sizes.append((question["width"], question["height"]))
+                # Put the item where it was saved, which may differ from the layout if it was dragged
+                self.questionPages[question["page"]].scene().addItem(item)
+                item.setPos(question["x"], question["y"])
+
+            for item, placement in zip(self.questionItems, self.questionLayout.set_sizes(sizes)):
+                item.setNumber(placement.number, self.questionLayout.number_width)
+
+            # Answers are laid out again, from their saved sizes so they need not be rendered yet
+            for item, question in zip(self.questionItems, opened.questions):
+                answer = self.new_answer(item)
+                if question.get("answer_width") is not None:
+                    answer.setReleased(answer.answer_text(), QSize(question["answer_width"], question["answer_height"]))
+                else:
+                    answer.setPlainText(answer.answer_text())
+                self.answerItems.append(answer)
+            self.answerLayout.set_sizes([self.item_size(answer) for answer in self.answerItems])
+            self.place_answers(0)
+
+            self.projectPath = path
+            self.openedProject = opened
+            for slot in list(self.questionPages) + list(self.answerPages):
+                slot.scene().loader = self.load_page_renders
+                if slot.view is not None:
+                    # Already on screen, so it will not be shown again
+                    slot.scene().materialize()
+                    slot.scene().restore_pixmaps()
+            self.questionPages.select(self.questionPages[0])
+            self.statusbar.showMessage(f"Opened {path}")
+        except Exception as e:
+            print(e)
 
-        # Add the QGraphicsView to the layout
-        scrollAreaAnswers.layout().addWidget(view)
-        self.answerPageCount += 1
-        view.setObjectName(f"Answer Page {self.answerPageCount}")
+    def load_page_renders(self, scene):
+        # Put the page's embedded images in the render cache, so showing the page does not render them
+        if self.openedProject is None:
+            return
+        cache = mrender.default_cache()
+        texts = {item.text for item in scene.items() if isinstance(item, EditableTextItem)}
+        missing = [text for text in texts if cache.get(text) is None]
+        for text, png in self.openedProject.renders(missing).items():
+            cache.put(text, png)
 
     def delete_page(self):
         try:
+            # Questions on the last question page go with it
             if self.questionPageCount > 1:
-                widgetToRemove = self.scrollAreaWidgetContents.layout().itemAt(
-                    self.scrollAreaWidgetContents.layout().count() - 1).widget()
-
-                # Check if the page being deleted is the currently selected page
-                if widgetToRemove.styleSheet() == "border: 2px solid blue":
-                    # If so, select the previous page
-                    previousPage = self.scrollAreaWidgetContents.layout().itemAt(
-                        self.scrollAreaWidgetContents.layout().count() - 2).widget()
-                    previousPage.setStyleSheet("border: 2px solid blue")
-
-                self.scrollAreaWidgetContents.layout().removeWidget(widgetToRemove)
-                widgetToRemove.setParent(None)
-                self.questionPageCount -= 1
-
-            if self.answerPageCount > 1:
-                widgetToRemove = self.scrollAreaAnswers.layout().itemAt(
-                    self.scrollAreaAnswers.layout().count() - 1).widget()
-
-                # Check if the page being deleted is the currently selected page
-                if widgetToRemove.styleSheet() == "border: 2px solid blue":
-                    # If so, select the previous page
-                    previousPage = self.scrollAreaAnswers.layout().itemAt(
-                        self.scrollAreaAnswers.layout().count() - 2).widget()
-                    previousPage.setStyleSheet("border: 2px solid blue")
-
-                self.scrollAreaAnswers.layout().removeWidget(widgetToRemove)
-                widgetToRemove.setParent(None)
-                self.answerPageCount -= 1
+                last_scene = self.questionPages[-1].scene()
+                for item in [item for item in self.questionItems if item.scene() is last_scene]:
+                    self.remove_question(item)
 
+            # Answer pages follow the questions by themselves
+            if self.questionPageCount > 1:
+                removed = self.questionPages.remove_last()
+
+                # If the page being deleted was selected, select the previous page
+                if removed.selected:
+                    self.questionPages.select(self.questionPages[-1])
         except Exception as e:
             print(e)
 
+    def on_page_selected(self, page):
+        # Only one page in the whole document is selected at a time
+        for page_list in (self.titlePages, self.questionPages, self.answerPages):
+            if page is None or page.page_list is not page_list:
+                page_list.deselect_all()
+        self.selectedPage = page
+
     def deselect_all_pages(self):
         # Deselect all pages
-        for view in self.findChildren(SelectableGraphicsView):
-            if view.styleSheet() == "border: 2px solid blue":
-                view.setStyleSheet("")
+        for page_list in (self.titlePages, self.questionPages, self.answerPages):
+            page_list.deselect_all()
         self.selectedPage = None
 
     def on_tab_changed(self, index):
         try:
-            # Deselect all pages
-            self.deselect_all_pages()
-
             # Select the first page of the new tab
-            if index == 0:
-                selectedPage = self.scrollAreaTitlePageWidgetContents.layout().itemAt(0).widget()
-            elif index == 1:
-                selectedPage = self.scrollAreaWidgetContents.layout().itemAt(0).widget()
-            elif index == 2:
-                selectedPage = self.scrollAreaAnswersWidgetContents.layout().itemAt(0).widget()
-
-            # Draw a blue rectangle around the view
-            selectedPage.setStyleSheet("border: 2px solid blue")
-
-            # Update the selectedPage in the parent (MyGui)
-            self.selectedPage = selectedPage
+            page_list = (self.titlePages, self.questionPages, self.answerPages)[index]
+            page_list.select(page_list[0])
         except Exception as e:
             print(e)
 
-    def save_pdf(self):
-        try:
-            # Create a QPrinter object
-            printer = QPrinter()
-            printer.setResolution(96)  # Set the resolution to 300 DPI
-            printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))  # Set the page size to A4
-            printer.setOutputFileName("output.pdf")  # Set the output file name
-
-            # Create a QPainter object and begin painting onto the printer
-            painter = QPainter(printer)
-
-            # Render the intro scene onto the printer
-            self.scene_intro.render(painter)
-
-            # Start a new page for each question scene
-            for i in range(self.questionPageCount):
-                printer.newPage()
-                questionPage = self.scrollAreaWidgetContents.layout().itemAt(i).widget()
-                questionPage.scene().render(painter)
-
-            # Start a new page for each answer scene
-            for i in range(self.answerPageCount):
-                printer.newPage()
-                answerPage = self.scrollAreaAnswersWidgetContents.layout().itemAt(i).widget()
-                answerPage.scene().render(painter)
-
-            # End painting
-            painter.end()
-        except Exception as e:
-            print(e)
-
-    def add_equation(self, item):
-        # Check all pages and set the selected page if it has the border style
-        for view in self.findChildren(SelectableGraphicsView):
-            if view.styleSheet() == "border: 2px solid blue":
-                self.selectedPage = view
-                break
-
-        equation_type = item.text()
-        if equation_type == "  3A Expanding and collecting like terms":
-            try:
-                # Load UI file
-                dialog = loadUi('questiondialog.ui')
+    def page_scenes(self):
+        """Every page scene in print order: the title page, the question pages and then the answer pages."""
+        return self.titlePages.scenes() + self.questionPages.scenes() + self.answerPages.scenes()
 
-                # Set validator for numofqueLine
-                validator = QIntValidator(0, 99)  # Allow numbers from 0 to 99
-                dialog.numofqueLine.setValidator(validator)
+    def render_failed(self, text, message):
+        # matplotlib's messages span several lines, the last one says what is wrong
+        self.statusbar.showMessage(f"Could not render {text}: {message.strip().splitlines()[-1]}")
 
-                # Create a button group
-                button_group = QButtonGroup()
+    def show_status(self):
+        if instrument.enabled():
+            self.statusbar.showMessage(instrument.summary())
+        else:
+            self.statusbar.showMessage(mrender.default_cache().summary())
 
-                # Add the buttons to the group
-                button_group.addButton(dialog.easyButton)
-                button_group.addButton(dialog.mediumButton)
-                button_group.addButton(dialog.hardButton)
+    def record_timings(self, on):
+        instrument.enable(on)
+        if on:
+            instrument.reset()
+            self.statusbar.showMessage("Recording timings")
+        else:
+            try:
+                path = instrument.write_trace()
+                self.statusbar.showMessage(f"{instrument.summary()} - written to {path}")
+            except OSError as e:
+                print(e)
 
-                # Set easyButton as the default checked button
-                dialog.easyButton.setChecked(True)
+    def set_performance_mode(self, on):
+        set_performance_mode(on)
+        for page_list in (self.titlePages, self.questionPages, self.answerPages):
+            page_list.configure_views()
 
-                # Ensure that one of the buttons is always checked
-                button_group.setExclusive(True)
+    def save_pdf(self):
+        try:
+            path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "output.pdf", "PDF files (*.pdf)")
+            if not path:
+                return
+
+            # Pages are snapshotted one at a time and written on a background thread
+            scenes = self.page_scenes()
+            export = pdfexport.PdfExport(scenes, path, self)
+
+            progress = QProgressDialog("Exporting PDF...", "Cancel", 0, len(scenes), self)
+            progress.setWindowTitle("Export PDF")
+            progress.setWindowModality(Qt.WindowModality.WindowModal)
+            progress.setMinimumDuration(300)
+            # One dialog is made per export, so it must not stay behind as a child of the window
+            progress.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            progress.canceled.connect(export.cancel)
+
+            def export_finished(path):
+                progress.close()
+                export.deleteLater()
+                self.statusbar.showMessage(f"Saved {path}")
+                if instrument.enabled():
+                    self.statusbar.showMessage(f"Saved {path}. {instrument.summary()}")
+
+            def export_failed(message):
+                progress.close()
+                export.deleteLater()
+                self.statusbar.showMessage(f"PDF export failed: {message}")
+                print(message)
+
+            export.progress.connect(lambda done, total: progress.setValue(done))
+            export.finished.connect(export_finished)
+            export.failed.connect(export_failed)
+            export.start()
+        except Exception as e:
+            print(e)
 
-                # Define a function to process the equation and close the dialog
-                def process_equation_and_close():
-                    # Process the equation here
-                    # ...
+    def export_text(self, default_name, file_filter):
+        try:
+            path, _ = QFileDialog.getSaveFileName(self, "Export", default_name, file_filter)
+            if not path:
+                return
+            # Written from the question text and answers, so nothing has to be rendered
+            title = os.path.splitext(os.path.basename(self.projectPath))[0] if self.projectPath else "Worksheet"
+            questions = [self.question_record(item, answer) for item, answer in zip(self.questionItems, self.answerItems)]
+            with instrument.span("text export"):
+                textexport.export(path, title, questions)
+            self.statusbar.showMessage(f"Saved {path}")
+        except Exception as e:
+            print(e)
 
-                    # Close the dialog
-                    dialog.close()
+    def question_dialog(self):
+        if self.questionDialog is None:
+            self.questionDialog = QuestionDialog(self)
+            # okButton closes the dialog, addButton adds an equation without closing it
+            self.questionDialog.okButton.clicked.connect(self.questionDialog.close)
+            self.questionDialog.addButton.clicked.connect(self.add_from_dialog)
+        return self.questionDialog
 
-                # Define a function to add the equation without closing the dialog
-                def add_equation():
-                    # Get the selected difficulty level
-                    if dialog.easyButton.isChecked():
-                        difficulty = "Easy"
-                    elif dialog.mediumButton.isChecked():
-                        difficulty = "Medium"
-                    else:  # dialog.hardButton must be checked
-                        difficulty = "Hard"
+    def add_from_dialog(self):
+        try:
+            with instrument.profiled("add question"), instrument.span("add question"):
+                dialog = self.questionDialog
+                topic, difficulty, count = dialog.topic, dialog.difficulty(), dialog.count()
+                if count == 0:
+                    return
+                # Every question gets its own seed, so it can be generated again from a saved project
+                if topic.cost == topics.HEAVY and not topics.banked(topic.code, difficulty, count):
+                    # Slow generators run in worker processes, each question is added as it arrives
+                    for _ in range(count):
+                        seed = Crand.default_sampler().randint(0, 2 ** 32 - 1)
+                        heavy.default_pool().submit(topic.generate, difficulty, seed,
+                                                    lambda seed, row: self.add_generated(topic, [seed], [row]))
+                    self.statusbar.showMessage(f"Generating {topic.label} questions: {count}")
+                else:
+                    with instrument.span("generate"):
+                        # Different questions, from the question bank if it has been built, which also
+                        # brings the rendered images
+                        pairs = topics.draw_each(topic.code, difficulty, count, Crand.default_sampler(),
+                                                 mrender.default_cache())
+                    self.add_generated(topic, [seed for seed, _ in pairs], [row for _, row in pairs])
+
+            # Reset easyButton to checked
+            dialog.easyButton.setChecked(True)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            self.statusbar.showMessage(f"Could not add questions: {e}")
 
-                    difficulty, equation_text, answer = mgen.generate_linear_equation(difficulty)
+    def add_generated(self, topic, seeds, rows):
+        """Add generated questions and their answers in one pass, then render them together.
 
-                    # Create a QGraphicsTextItem with the equation text
-                    equation_item = EditableTextItem(equation_text, difficulty)
-                    equation_item.setPlainText(equation_text)
-                    equation_item.answer = answer
+        seeds[i] is the seed of rows[i]. A seed of None means the question could not be generated,
+        its row is then the reason.
+        """
+        try:
+            if None in seeds:
+                self.statusbar.showMessage(f"Could not generate a {topic.code} question: {rows[seeds.index(None)]}")
+                return
+            items = []
+            for seed, (difficulty, equation_text, answer) in zip(seeds, rows):
+                # Create a QGraphicsTextItem with the equation text
+                equation_item = EditableTextItem(topic.code, difficulty)
+                equation_item.setPending(equation_text)
+                equation_item.answer = answer
+                equation_item.seed = seed
+                items.append(equation_item)
+
+            # Flow the equations onto the question pages after the existing questions
+            with instrument.span("insert questions"), self.updates_suspended():
+                answers = self.add_questions(items, render=False)
+
+            # One render job for the questions and one for the answers, instead of one for each item
+            pool = mrender.default_pool()
+            pool.request_many([item.text for item in items],
+                              lambda pixmaps: self.set_rendered(items, pixmaps, self.questionItems,
+                                                                self.questionLayout, self.place_questions),
+                              render=topic.render)
+            pool.request_many([answer.text for answer in answers],
+                              lambda pixmaps: self.set_rendered(answers, pixmaps, self.answerItems,
+                                                                self.answerLayout, self.place_answers))
+            self.show_status()
+        except Exception as e:
+            print(f"An error occurred: {e}")
 
-                    # Add the QGraphicsTextItem to the scene of the selected page
-                    if self.selectedPage is not None:
-                        self.selectedPage.scene().addItem(equation_item)
+    def set_rendered(self, items, pixmaps, all_items, layout, place):
+        """Show the rendered pixmaps of a batch of items, then move the items after them once."""
+        try:
+            with instrument.span("insert questions"), self.updates_suspended():
+                positions = {item: index for index, item in enumerate(all_items)}
+                start = len(all_items)
+                for item in items:
+                    # Skip items deleted while they were rendering
+                    if item in positions:
+                        item.setRendered(item.text, pixmaps[item.text])
+                        start = min(start, layout.resize(positions[item], self.item_size(item)))
+                place(start)
+            self.show_status()
+        except Exception as e:
+            print(f"An error occurred: {e}")
 
-                        # Generate random coordinates within the bounds of the scene
-                        x = random.uniform(0, self.selectedPage.scene().width() - equation_item.boundingRect().width())
-                        y = random.uniform(0,
-                                           self.selectedPage.scene().height() - equation_item.boundingRect().height())
+    def add_equation(self, item):
+        code = item.data(Qt.ItemDataRole.UserRole)
+        if code is None:
+            print("Not Valid")
+            return
+        topic = topics.get(code)
+        if not topic.available:
+            print("Not Done")
+            return
+        try:
+            dialog = self.question_dialog()
+            dialog.topic = topic
+            dialog.setWindowTitle(topic.label)
+            dialog.easyButton.setChecked(True)
+            if topic.cost == topics.HEAVY:
+                # Start the workers while the dialog is open, so they are warm by the time Add is pressed
+                heavy.default_pool()
 
-                        # Set the position of the equation_item in the scene
-                        equation_item.setPos(x, y)
+            # Show dialog and wait for user to press OK
+            dialog.exec()
+        except Exception as e:
+            print(f"An error occurred: {e}")
 
-                    # Reset easyButton to checked
-                    dialog.easyButton.setChecked(True)
 
-                # Connect the clicked signal of the okButton to the slot
-                dialog.okButton.clicked.connect(process_equation_and_close)
+def report_startup_time(app):
+    """Print how long it took from starting Python to the window being up and idle, then quit."""
+    shown = time.perf_counter()
 
-                # Connect the clicked signal of the addButton to the slot
-                dialog.addButton.clicked.connect(add_equation)
+    def idle():
+        print(f"Window shown after {(shown - _START) * 1000:.0f} ms, "
+              f"idle after {(time.perf_counter() - _START) * 1000:.0f} ms")
+        app.quit()
 
-                # Show dialog and wait for user to press OK
-                dialog.exec()
-            except Exception as e:
-                print(f"An error occurred: {e}")
+    QTimer.singleShot(0, idle)
 
 
-        elif equation_type == "  3B Factorising":
-            print("Not Done")
-        elif equation_type == "  3C Quadratic Equations":
-            print("Not Done")
-        elif equation_type == "  3D Graphing Quadratics":
-            print("Not Done")
-        elif equation_type == "  3F Completing The Square And Turning Points":
-            print("Not Done")
-        elif equation_type == "  3G Solving Quadratic Inequalities":
-            print("Not Done")
-        elif equation_type == "  3H The General Quadratic Formula":
-            print("Not Done")
-        elif equation_type == "  3I The Discriminant":
-            print("Not Done")
-        elif equation_type == "  3J Solving Simultaneous Linear and Quadratic Equations":
-            print("Not Done")
-        elif equation_type == "  3K Families of Quadratic Polynomial Functions":
-            print("Not Done")
-        elif equation_type == "  3L Quadratic Models":
-            print("Not Done")
-        else:
-            print("Not Valid")
 def main():
-    app = QApplication([])
+    app = QApplication(sys.argv)
     window = MyGui()
+
+    # Load matplotlib in the background once the window is up, so the first equation renders quickly
+    QTimer.singleShot(0, mrender.default_pool().warm_up)
+    app.aboutToQuit.connect(heavy.shutdown)
+
+    if "--startup-time" in sys.argv or os.environ.get("SAT_STARTUP_TIME"):
+        report_startup_time(app)
     app.exec()
 
 
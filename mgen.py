@@ -1,44 +1,48 @@
-import random
+import numpy as np
 
 import Crand
-from sympy import symbols, solve, simplify, factor, expand
-import sympy as sp
+from poly import Poly, coefficient_prefix, format_terms
 
 
-# For Quadratics Expansion
-def expand(original_equation):
-    expanded_expression = sp.expand(original_equation)
-    expanded_expression_str = str(expanded_expression).replace('**', '^').replace('*', '')
-    terms = expanded_expression_str.split(' + ')
-    terms.sort(key=lambda term: 'x^2' not in term)
-    return ' + '.join(terms)
+def format_product(*factors):
+    """Write polynomial factors side by side, e.g. '(x + 1)(x - 2)', using a square for repeats."""
+    if len(factors) == 2 and factors[0] == factors[1]:
+        return f"({factors[0]})^2"
+    return "".join(f"({factor})" for factor in factors)
 
 
-def generate_linear_equation(difficulty):
-    def expand_linear(original_equation):
-        expanded_expression = sp.expand(original_equation)
-        expanded_expression_str = str(expanded_expression).replace('**', '^').replace('*', '')
-        return expanded_expression_str
+def sign_text(sign):
+    return "+" if sign > 0 else "-"
+
+
+def generate_linear_equation(difficulty, rng=None):
+    rng = rng or Crand.default_sampler()
 
     def generate_equation_easy():
-        x, y = sp.symbols('x y')
-        answer = f"({Crand.non_zero_randint(-20, 20)}*x {random.choice(['+', '-'])} {Crand.non_zero_randint(0, 20)}*y) {random.choice(['+', '-'])} ({Crand.non_zero_randint(-20, 20)}*x {random.choice(['+', '-'])} {Crand.non_zero_randint(0, 20)}*y)"
-        expanded_equation = expand_linear(answer)
-        answer = str(answer).replace('**', '^').replace('*', '')
+        a, b = rng.non_zero_randint(-20, 20), rng.non_zero_randint(0, 20)
+        c, d = rng.non_zero_randint(-20, 20), rng.non_zero_randint(0, 20)
+        s1, s2, s3 = rng.sign(), rng.sign(), rng.sign()
+        answer = (f"({format_terms([(a, 'x'), (s1 * b, 'y')])}) {sign_text(s2)} "
+                  f"({format_terms([(c, 'x'), (s3 * d, 'y')])})")
+        # Collect the x and y terms separately
+        expanded_equation = format_terms([(a + s2 * c, 'x'), (s1 * b + s2 * s3 * d, 'y')])
         return answer, expanded_equation
 
     def generate_equation_medium():
-        x = sp.symbols('x')
-        answer = f"{random.randint(-10, 10)}*x*({random.randint(-10, 10)}*x {random.choice(['+', '-'])} {random.randint(10, 20)})"
-        expanded_equation = expand_linear(answer)
-        answer = str(answer).replace('**', '^').replace('*', '')
+        a, c, d = rng.non_zero_randint(-10, 10), rng.non_zero_randint(-10, 10), rng.randint(10, 20)
+        inner = Poly.linear(c, rng.sign() * d)
+        answer = f"{coefficient_prefix(a)}x({inner})"
+        expanded_equation = str(Poly.monomial(a) * inner)
         return answer, expanded_equation
 
     def generate_equation_hard():
-        x = sp.symbols('x')
-        answer = f"{Crand.non_zero_randint(-10, 10)}*x*({Crand.non_zero_randint(-10, 10)}*x {random.choice(['+', '-'])} {Crand.non_zero_randint(10, 20)}) {random.choice(['+', '-'])} {Crand.non_zero_randint(0, 10)}*x*({Crand.non_zero_randint(-10, 10)}*x {random.choice(['+', '-'])} {Crand.non_zero_randint(10, 20)})"
-        expanded_equation = expand_linear(answer)
-        answer = str(answer).replace('**', '^').replace('*', '')
+        a, b, c = rng.non_zero_randint(-10, 10), rng.non_zero_randint(-10, 10), rng.non_zero_randint(10, 20)
+        d, e, f = rng.non_zero_randint(0, 10), rng.non_zero_randint(-10, 10), rng.non_zero_randint(10, 20)
+        first = Poly.linear(b, rng.sign() * c)
+        second = Poly.linear(e, rng.sign() * f)
+        sign = rng.sign()
+        answer = f"{coefficient_prefix(a)}x({first}) {sign_text(sign)} {coefficient_prefix(d)}x({second})"
+        expanded_equation = str(Poly.monomial(a) * first + Poly.monomial(sign * d) * second)
         return answer, expanded_equation
 
     if difficulty == "Easy":
@@ -52,21 +56,20 @@ def generate_linear_equation(difficulty):
 
     return difficulty, answer, expanded_equation
 
-def generate_factorise_equation(difficulty):
+def generate_factorise_equation(difficulty, rng=None):
+    rng = rng or Crand.default_sampler()
+
     def generate_equation(lower, upper):
-        x = sp.symbols('x')
-        num1, num2 = Crand.non_zero_randint(lower, upper), Crand.non_zero_randint(lower, upper)
-        original_equation = (x + num1) * (x + num2)
-        expanded_equation = expand(original_equation)
-        expanded_equation = str(expanded_equation).replace("**","^").replace("*", "")
-        original_equation_str = str(original_equation).replace("**","^").replace("*", "")
+        num1, num2 = rng.non_zero_randint(lower, upper), rng.non_zero_randint(lower, upper)
+        first, second = Poly.linear(1, num1), Poly.linear(1, num2)
+        expanded_equation = str(first * second)
+        original_equation_str = format_product(first, second)
         return expanded_equation, original_equation_str  # Flip the order here
     def generate_equation_hard():
-        x = sp.symbols('x')
-        original_equation = f"({Crand.non_zero_randint(-5, 5)}*x {random.choice(['+', '-'])} {random.randint(1, 5)})*({Crand.non_zero_randint(-5, 5)}*x {random.choice(['+', '-'])} {random.randint(1, 5)})"
-        expanded_equation = expand(original_equation)
-        expanded_equation = str(expanded_equation).replace("**","^").replace("*", "")
-        original_equation_str = str(original_equation).replace("**","^").replace("*", "")
+        first = Poly.linear(rng.non_zero_randint(-5, 5), rng.sign() * rng.randint(1, 5))
+        second = Poly.linear(rng.non_zero_randint(-5, 5), rng.sign() * rng.randint(1, 5))
+        expanded_equation = str(first * second)
+        original_equation_str = format_product(first, second)
         return expanded_equation, original_equation_str  # Flip the order here
 
     if difficulty == "Easy":
@@ -81,11 +84,12 @@ def generate_factorise_equation(difficulty):
     return difficulty, equation_text, answer
 
 
-def construct_quadratic(difficulty):
+def construct_quadratic(difficulty, rng=None):
+    rng = rng or Crand.default_sampler()
+
     def generate_equation(lower, upper):
-        x = sp.symbols('x')
-        x1, x2 = random.randint(lower, upper), random.randint(lower, upper)
-        answer = (x - x1) * (x - x2)
+        x1, x2 = rng.randint(lower, upper), rng.randint(lower, upper)
+        answer = Poly.linear(1, -x1) * Poly.linear(1, -x2)
         return answer, (x1, x2)
 
     if difficulty == "Easy":
@@ -95,8 +99,320 @@ def construct_quadratic(difficulty):
     elif difficulty == "Hard":
         equation, answer = generate_equation(-10, 10)
     else:
-        equation, answer = "Unknown difficulty", None
+        return difficulty, "Unknown difficulty", None
+
+    equation_text = str(equation)
+
+    return difficulty, equation_text, answer
+
+
+def _point_text(x, y):
+    import sympy as sp
+    return f"({sp.latex(x)}, {sp.latex(y)})"
+
+
+def generate_simultaneous_equations(difficulty, rng=None):
+    """3J: where a parabola and a line meet, solved with sympy.solve.
+
+    Easy and Medium lines go through two integer points of the parabola. Hard ones are drawn at
+    random, so the points can be surds; lines that miss the parabola are drawn again.
+    """
+    import sympy as sp
+
+    rng = rng or Crand.default_sampler()
+    x, y = sp.symbols("x y")
+
+    def through_points(lower, upper, b):
+        # The line through (x1, p(x1)) and (x2, p(x2)) on p = x^2 + bx + c
+        x1 = rng.randint(lower, upper)
+        x2 = rng.randint(lower, upper, exclude=(x1,))
+        c = rng.randint(-9, 9)
+        return Poly([c, b, 1]), Poly.linear(x1 + x2 + b, c - x1 * x2)
+
+    if difficulty == "Easy":
+        parabola, line = through_points(-4, 4, 0)
+    elif difficulty == "Medium":
+        parabola, line = through_points(-5, 5, rng.randint(-5, 5))
+    elif difficulty == "Hard":
+        while True:
+            parabola = Poly([rng.randint(-9, 9), rng.randint(-6, 6), rng.non_zero_randint(-3, 3)])
+            line = Poly.linear(rng.non_zero_randint(-6, 6), rng.randint(-9, 9))
+            difference = parabola - line
+            if difference.coeff(1) ** 2 - 4 * difference.coeff(2) * difference.coeff(0) > 0:
+                break
+    else:
+        return difficulty, "Unknown difficulty", None
+
+    solutions = sp.solve([sp.Eq(y, parabola.to_sympy()), sp.Eq(y, line.to_sympy())], [x, y], dict=True)
+    points = sorted(((solution[x], solution[y]) for solution in solutions), key=lambda point: float(point[0]))
+    question = rf"y = {parabola},\quad y = {line}"
+    answer = r",\quad ".join(_point_text(*point) for point in points)
+    return difficulty, question, answer
+
+
+# Batch generation
+#
+# Every topic and difficulty is described by a BatchSpec: the set of values each coefficient can take
+# and how to expand them. Coefficients are drawn all at once as NumPy arrays and the expansions are
+# array arithmetic over those columns. Question and answer text is only formatted when a row is read.
+
+# Spaces with at most this many coefficient combinations are enumerated in full by generate_distinct
+ENUMERATE_LIMIT = 200_000
+
+
+def values(lower, upper, exclude=()):
+    """Array of the integers lower..upper inclusive that are not in exclude."""
+    return np.array([v for v in range(lower, upper + 1) if v not in exclude], dtype=np.int64)
+
+
+def signed(lower, upper):
+    """Array of lower..upper together with their negatives."""
+    positive = values(lower, upper)
+    return np.concatenate([-positive[::-1], positive])
+
+
+SIGNS = np.array([1, -1], dtype=np.int64)
+
+
+def binomial_product(a, b, c, d):
+    """Coefficient columns (constant, x, x^2) of (ax + b)(cx + d) for arrays a, b, c, d."""
+    return b * d, a * d + b * c, a * c
+
+
+def canonical_hash(columns):
+    """64 bit hash of each row of the given columns, used to tell questions apart."""
+    result = np.full(len(columns[0]), 0xcbf29ce484222325, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in columns:
+            result ^= np.asarray(column).astype(np.uint64)
+            result *= np.uint64(0x100000001b3)
+            result ^= result >> np.uint64(29)
+    return result.view(np.int64)
+
+
+class QuestionBatch:
+    """Columnar result of generate_batch.
+
+    columns maps a name to a NumPy array with one entry per question. The expanded polynomial of
+    every question is kept in the x2, x1 and x0 columns (x and y for 3A Easy).
+    """
+
+    def __init__(self, topic, difficulty, columns, spec):
+        self.topic = topic
+        self.difficulty = difficulty
+        self.columns = columns
+        self.spec = spec
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, indices):
+        """A new batch holding only the given rows."""
+        columns = {name: column[indices] for name, column in self.columns.items()}
+        return QuestionBatch(self.topic, self.difficulty, columns, self.spec)
+
+    def hashes(self):
+        """Canonical hash of every question. Two rows with the same hash ask the same question."""
+        return canonical_hash([self.columns[name] for name in self.spec.key])
+
+    def values(self, i):
+        """The coefficients of question i as Python ints."""
+        return {name: int(column[i]) for name, column in self.columns.items()}
+
+    def row(self, i):
+        """Question i in the same (difficulty, question, answer) form as the single generators."""
+        values = self.values(i)
+        return self.difficulty, self.spec.question(values), self.spec.answer(values)
+
+    def rows(self):
+        return [self.row(i) for i in range(len(self))]
+
+
+class BatchSpec:
+    """How one topic and difficulty is drawn, expanded and written out in bulk.
+
+    slots maps each coefficient name to the array of values it can take, expand turns the drawn
+    coefficient columns into the expansion columns, and key names the columns that identify a question.
+    """
+
+    def __init__(self, topic, slots, expand, question, answer, key=("x2", "x1", "x0")):
+        self.topic = topic
+        self.slots = slots
+        self.expand = expand
+        self.question = question
+        self.answer = answer
+        self.key = key
+
+    def space_size(self):
+        """Number of coefficient combinations. Several may give the same question."""
+        size = 1
+        for options in self.slots.values():
+            size *= len(options)
+        return size
+
+    def build(self, difficulty, params):
+        columns = dict(params)
+        columns.update(self.expand(**params))
+        return QuestionBatch(self.topic, difficulty, columns, self)
+
+    def draw(self, difficulty, n, rng):
+        return self.build(difficulty, {name: rng.choice(options, size=n) for name, options in self.slots.items()})
+
+    def enumerate(self, difficulty):
+        """Every coefficient combination as one batch."""
+        grids = np.meshgrid(*self.slots.values(), indexing="ij")
+        return self.build(difficulty, {name: grid.ravel() for name, grid in zip(self.slots, grids)})
+
+
+def _quadratic_text(v):
+    return str(Poly([v["x0"], v["x1"], v["x2"]]))
+
+
+def _linear_easy_question(v):
+    return (f"({format_terms([(v['a'], 'x'), (v['b'], 'y')])}) {sign_text(v['s'])} "
+            f"({format_terms([(v['c'], 'x'), (v['d'], 'y')])})")
+
+
+def _linear_easy_answer(v):
+    return format_terms([(v["x"], 'x'), (v["y"], 'y')])
+
+
+def _linear_easy_expand(a, b, s, c, d):
+    return {"x": a + s * c, "y": b + s * d}
+
+
+def _linear_medium_question(v):
+    return f"{coefficient_prefix(v['a'])}x({Poly.linear(v['c'], v['d'])})"
+
+
+def _linear_medium_expand(a, c, d):
+    x0, x1, x2 = binomial_product(a, 0, c, d)
+    return {"x2": x2, "x1": x1, "x0": np.zeros_like(a)}
+
+
+def _linear_hard_question(v):
+    return (f"{coefficient_prefix(v['a'])}x({Poly.linear(v['b'], v['c'])}) {sign_text(v['d'])} "
+            f"{coefficient_prefix(abs(v['d']))}x({Poly.linear(v['e'], v['f'])})")
+
+
+def _linear_hard_expand(a, b, c, d, e, f):
+    _, x1_first, x2_first = binomial_product(a, 0, b, c)
+    _, x1_second, x2_second = binomial_product(d, 0, e, f)
+    return {"x2": x2_first + x2_second, "x1": x1_first + x1_second, "x0": np.zeros_like(a)}
+
+
+def _factorise_answer(v):
+    return format_product(Poly.linear(v["a"], v["b"]), Poly.linear(v["c"], v["d"]))
+
+
+def _factorise_expand(a, b, c, d):
+    x0, x1, x2 = binomial_product(a, b, c, d)
+    return {"x2": x2, "x1": x1, "x0": x0}
+
+
+def _monic_factorise_expand(b, d):
+    return _factorise_expand(np.ones_like(b), b, np.ones_like(d), d)
+
+
+def _monic_factorise_answer(v):
+    return format_product(Poly.linear(1, v["b"]), Poly.linear(1, v["d"]))
+
+
+def _quadratic_answer(v):
+    return v["r1"], v["r2"]
+
+
+def _quadratic_expand(r1, r2):
+    x0, x1, x2 = binomial_product(1, -r1, 1, -r2)
+    return {"x2": np.ones_like(r1), "x1": x1, "x0": x0}
+
+
+def _linear_spec(slots, expand, question, answer=_quadratic_text):
+    # For expansions the question itself is the drawn coefficients
+    return BatchSpec("3A", slots, expand, question, answer, key=tuple(slots))
+
+
+BATCH_SPECS = {
+    ("3A", "Easy"): _linear_spec({"a": values(-20, 20, [0]), "b": signed(1, 20), "s": SIGNS,
+                                  "c": values(-20, 20, [0]), "d": signed(1, 20)},
+                                 _linear_easy_expand, _linear_easy_question, _linear_easy_answer),
+    ("3A", "Medium"): _linear_spec({"a": values(-10, 10, [0]), "c": values(-10, 10, [0]), "d": signed(10, 20)},
+                                   _linear_medium_expand, _linear_medium_question),
+    ("3A", "Hard"): _linear_spec({"a": values(-10, 10, [0]), "b": values(-10, 10, [0]), "c": signed(10, 20),
+                                  "d": signed(1, 10), "e": values(-10, 10, [0]), "f": signed(10, 20)},
+                                 _linear_hard_expand, _linear_hard_question),
+    ("3B", "Easy"): BatchSpec("3B", {"b": values(1, 5), "d": values(1, 5)},
+                              _monic_factorise_expand, _quadratic_text, _monic_factorise_answer),
+    ("3B", "Medium"): BatchSpec("3B", {"b": values(-5, 5, [0]), "d": values(-5, 5, [0])},
+                                _monic_factorise_expand, _quadratic_text, _monic_factorise_answer),
+    ("3B", "Hard"): BatchSpec("3B", {"a": values(-5, 5, [0]), "b": signed(1, 5),
+                                     "c": values(-5, 5, [0]), "d": signed(1, 5)},
+                              _factorise_expand, _quadratic_text, _factorise_answer),
+    ("3C", "Easy"): BatchSpec("3C", {"r1": values(1, 5), "r2": values(1, 5)},
+                              _quadratic_expand, _quadratic_text, _quadratic_answer),
+    ("3C", "Medium"): BatchSpec("3C", {"r1": values(-5, 5), "r2": values(-5, 5)},
+                                _quadratic_expand, _quadratic_text, _quadratic_answer),
+    ("3C", "Hard"): BatchSpec("3C", {"r1": values(-10, 10), "r2": values(-10, 10)},
+                              _quadratic_expand, _quadratic_text, _quadratic_answer),
+}
+
+
+def batch_spec(topic, difficulty):
+    try:
+        return BATCH_SPECS[(topic, difficulty)]
+    except KeyError:
+        raise ValueError(f"No batch generator for {topic} {difficulty}") from None
+
+
+def generate_batch(topic, difficulty, n, rng=None):
+    """Generate n questions of a topic ("3A", "3B" or "3C") at once and return a QuestionBatch.
+
+    rng may be a Crand.Sampler or a seed. Drawing and expanding 100k questions takes milliseconds;
+    text is only built for the rows that are read. Questions may repeat, see generate_distinct.
+    """
+    return batch_spec(topic, difficulty).draw(difficulty, n, Crand.sampler(rng))
+
+
+def _unique_rows(batch):
+    """Keep the first row for every distinct question, in their original order."""
+    _, first = np.unique(batch.hashes(), return_index=True)
+    return batch.take(np.sort(first))
+
+
+def question_count(topic, difficulty):
+    """How many different questions a topic and difficulty can produce, or None if the space is too big to count."""
+    spec = batch_spec(topic, difficulty)
+    if spec.space_size() > ENUMERATE_LIMIT:
+        return None
+    return len(_unique_rows(spec.enumerate(difficulty)))
+
+
+def generate_distinct(topic, difficulty, n, rng=None):
+    """Generate n questions that are all different from each other.
+
+    Small spaces are enumerated up front and sampled without replacement, larger ones are drawn in
+    batches and deduplicated on their canonical hash. Asking for more questions than exist raises
+    ValueError straight away.
+    """
+    spec = batch_spec(topic, difficulty)
+    rng = Crand.sampler(rng)
 
-    equation_text = sp.expand(equation)
+    if spec.space_size() <= ENUMERATE_LIMIT:
+        everything = _unique_rows(spec.enumerate(difficulty))
+        if n > len(everything):
+            raise ValueError(f"Only {len(everything)} different {topic} {difficulty} questions exist, "
+                             f"but {n} were requested")
+        return everything.take(rng.rng.choice(len(everything), size=n, replace=False))
 
-    return difficulty, equation_text, answer
\ No newline at end of file
+    if n > spec.space_size():
+        raise ValueError(f"At most {spec.space_size()} different {topic} {difficulty} questions exist, "
+                         f"but {n} were requested")
+    batch = _unique_rows(spec.draw(difficulty, n, rng))
+    while len(batch) < n:
+        extra = spec.draw(difficulty, 2 * (n - len(batch)) + 16, rng)
+        batch = _unique_rows(QuestionBatch(topic, difficulty, {name: np.concatenate([batch[name], extra[name]])
+                                                                for name in batch.columns}, spec))
+    return batch.take(np.arange(n))
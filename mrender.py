@@ -0,0 +1,486 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QObject, QPointF, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPixmap
+
+import instrument
+
+# Defaults used by EditableTextItem.setPlainText
+FONT_SIZE = 20
+DPI = 100
+
+# Resolution of images that have no vector form, like graphs, when printing
+PRINT_DPI = 300
+
+# Padding savefig(bbox_inches='tight') leaves around an equation, in inches
+PAD_INCHES = 0.1
+
+# Where rendered PNGs are kept between runs. Set SAT_RENDER_CACHE to a folder to move it,
+# or to an empty string to keep the cache in memory only.
+DEFAULT_DISK_DIR = os.path.join(os.path.expanduser("~"), ".cache", "SAT-1", "render")
+
+# matplotlib's mathtext parser and font objects are shared and not thread safe. Everything that
+# lays out text with matplotlib holds this, whether on the render thread or the GUI thread.
+matplotlib_lock = threading.RLock()
+
+
+def render_png(text, size=FONT_SIZE, dpi=DPI):
+    """Render a LaTeX string with mathtext and return the PNG bytes.
+
+    This only uses a private Figure and Agg canvas, never pyplot's global figure manager,
+    so it can run away from the GUI thread under matplotlib_lock.
+    """
+    # matplotlib takes a while to import, so it is only loaded once something is rendered
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with matplotlib_lock:
+        fig = Figure(figsize=(6, 5), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+
+        with instrument.span("mathtext"):
+            text_obj = fig.text(0.5, 0.5, f'${text}$', size=size, ha='center', va='center')
+
+            renderer = canvas.get_renderer()
+            bbox = text_obj.get_window_extent(renderer)
+
+        # Adjust the figure size to make the bounding box slightly bigger
+        fig.set_size_inches(bbox.width / renderer.dpi * 0.5, bbox.height / renderer.dpi * 0.5)
+
+        buf = BytesIO()
+        with instrument.span("png encode"):
+            fig.savefig(buf, format='png', bbox_inches='tight')  # Remove padding around the figure
+    return buf.getvalue()
+
+
+def _to_painter_path(text_path):
+    """Convert a matplotlib Path to a QPainterPath, flipping y so it points down like Qt."""
+    from matplotlib.path import Path
+
+    path = QPainterPath()
+    path.setFillRule(Qt.FillRule.WindingFill)
+    for vertices, code in text_path.iter_segments(simplify=False, curves=True):
+        points = [QPointF(vertices[i], -vertices[i + 1]) for i in range(0, len(vertices), 2)]
+        if code == Path.MOVETO:
+            path.moveTo(points[0])
+        elif code == Path.LINETO:
+            path.lineTo(points[0])
+        elif code == Path.CURVE3:
+            path.quadTo(points[0], points[1])
+        elif code == Path.CURVE4:
+            path.cubicTo(points[0], points[1], points[2])
+        elif code == Path.CLOSEPOLY:
+            path.closeSubpath()
+    return path
+
+
+_paths = OrderedDict()
+_paths_lock = threading.Lock()
+MAX_PATHS = 4096
+
+
+def math_path(text, size=FONT_SIZE, dpi=DPI):
+    """The outlines of a LaTeX string as a QPainterPath, for resolution independent printing.
+
+    The path uses the same pixel units and padding as render_png, so it can be drawn in place of
+    the equation's pixmap.
+    """
+    key = cache_key(text, size, dpi)
+    with _paths_lock:
+        path = _paths.get(key)
+        if path is not None:
+            _paths.move_to_end(key)
+            return path
+
+    from matplotlib.textpath import TextPath
+
+    # TextPath works in points, the pixmaps in pixels at dpi
+    with matplotlib_lock:
+        text_path = TextPath((0, 0), f'${text}$', size=size * dpi / 72)
+    path = _to_painter_path(text_path)
+    bounds = path.boundingRect()
+    pad = PAD_INCHES * dpi
+    path.translate(pad - bounds.left(), pad - bounds.top())
+
+    with _paths_lock:
+        _paths[key] = path
+        if len(_paths) > MAX_PATHS:
+            _paths.popitem(last=False)
+    return path
+
+
+def has_path(text, size=FONT_SIZE, dpi=DPI):
+    """Whether the outlines of a LaTeX string are already made."""
+    with _paths_lock:
+        return cache_key(text, size, dpi) in _paths
+
+
+def make_paths(texts, size=FONT_SIZE, dpi=DPI):
+    """Make the outlines of several LaTeX strings, skipping any that cannot be laid out."""
+    for text in texts:
+        try:
+            math_path(text, size, dpi)
+        except Exception:
+            # The equation failed to render as well, and is reported from there
+            pass
+
+
+def path_size(path, dpi=DPI):
+    """Width and height of the area a math_path covers, including its padding."""
+    bounds = path.boundingRect()
+    pad = PAD_INCHES * dpi
+    return bounds.right() + pad, bounds.bottom() + pad
+
+
+def warm_up():
+    """Import matplotlib and prime the mathtext parser, so the first real equation renders quickly."""
+    render_png("x^2 + 1")
+    import matplotlib.textpath  # noqa: F401  used by math_path when printing
+
+
+def render_all(texts, size=FONT_SIZE, dpi=DPI, render=None):
+    """PNG bytes of several equations, rendered one after another in a single job.
+
+    An equation that cannot be rendered gives its error message, a str, in place of its PNG, so
+    one bad equation does not lose the others.
+    """
+    render = render or render_png
+    results = []
+    for text in texts:
+        try:
+            results.append(render(text, size, dpi))
+        except Exception as e:
+            results.append(f"{type(e).__name__}: {e}")
+    return results
+
+
+def cache_key(text, size=FONT_SIZE, dpi=DPI):
+    """Content address of a rendered equation."""
+    return hashlib.sha256(f"{size}\0{dpi}\0{text}".encode("utf-8")).hexdigest()
+
+
+def pixmap_bytes(pixmap):
+    """Approximate memory used by a QPixmap."""
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class RenderCache:
+    """Two level cache of rendered equations keyed on (text, font size, DPI).
+
+    The first level is an in-memory LRU of QPixmaps limited to max_bytes. The second level is an
+    optional folder of PNG files named by their content address, so it survives restarts.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._pixmaps = OrderedDict()
+        self._sizes = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".png")
+
+    def _remember(self, key, pixmap):
+        if key in self._pixmaps:
+            self.current_bytes -= self._sizes.pop(key)
+            del self._pixmaps[key]
+        size = pixmap_bytes(pixmap)
+        if size > self.max_bytes:
+            return
+        self._pixmaps[key] = pixmap
+        self._sizes[key] = size
+        self.current_bytes += size
+        # Drop the least recently used pixmaps until we are back under budget
+        while self.current_bytes > self.max_bytes:
+            old_key, _ = self._pixmaps.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(old_key)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, png):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a half written PNG behind
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write render cache file: {e}")
+
+    def get(self, text, size=FONT_SIZE, dpi=DPI):
+        """Return the cached QPixmap for an equation, or None if it has not been rendered yet."""
+        key = cache_key(text, size, dpi)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.hits += 1
+            return pixmap
+
+        png = self._read_disk(key)
+        if png is not None:
+            pixmap = QPixmap()
+            with instrument.span("png decode"):
+                loaded = pixmap.loadFromData(png)
+            if loaded:
+                self._remember(key, pixmap)
+                self.disk_hits += 1
+                return pixmap
+        return None
+
+    def put(self, text, png, size=FONT_SIZE, dpi=DPI):
+        """Store rendered PNG bytes for an equation and return them as a QPixmap."""
+        key = cache_key(text, size, dpi)
+        pixmap = QPixmap()
+        with instrument.span("png decode"):
+            pixmap.loadFromData(png)
+        self._remember(key, pixmap)
+        self._write_disk(key, png)
+        return pixmap
+
+    def png(self, text, size=FONT_SIZE, dpi=DPI):
+        """PNG bytes of an equation that is already cached, or None. Nothing is rendered."""
+        key = cache_key(text, size, dpi)
+        png = self._read_disk(key)
+        if png is None and key in self._pixmaps:
+            data = QByteArray()
+            buffer = QBuffer(data)
+            buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+            self._pixmaps[key].save(buffer, "PNG")
+            png = bytes(data)
+        return png
+
+    def pixmap(self, text, size=FONT_SIZE, dpi=DPI):
+        """Return the QPixmap for an equation, rendering it on a miss."""
+        pixmap = self.get(text, size, dpi)
+        if pixmap is None:
+            self.misses += 1
+            pixmap = self.put(text, render_png(text, size, dpi), size, dpi)
+        return pixmap
+
+    def clear(self):
+        """Forget the in-memory pixmaps. Files on disk are kept."""
+        self._pixmaps.clear()
+        self._sizes.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._pixmaps),
+            "bytes": self.current_bytes,
+        }
+
+    def summary(self):
+        """Short human readable description for the status bar."""
+        return (f"Render cache: {self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses, "
+                f"{self.current_bytes // 1024} KiB in memory")
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The cache shared by every EditableTextItem in the application."""
+    global _default_cache
+    if _default_cache is None:
+        disk_dir = os.environ.get("SAT_RENDER_CACHE", DEFAULT_DISK_DIR)
+        _default_cache = RenderCache(disk_dir=disk_dir or None)
+    return _default_cache
+
+
+_placeholder = None
+
+
+def placeholder_pixmap():
+    """Grey box shown by an item while its equation is still being rendered."""
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = QPixmap(160, 48)
+        _placeholder.fill(QColor(235, 235, 235))
+        painter = QPainter(_placeholder)
+        painter.setPen(QColor(150, 150, 150))
+        painter.drawRect(0, 0, 159, 47)
+        painter.drawText(_placeholder.rect(), Qt.AlignmentFlag.AlignCenter, "Rendering...")
+        painter.end()
+    return _placeholder
+
+
+def error_pixmap(text):
+    """Red box with the LaTeX of an equation that could not be rendered, shown in its place."""
+    font = QFont()
+    metrics = QFontMetrics(font)
+    width = min(metrics.horizontalAdvance(text) + 16, 600)
+    pixmap = QPixmap(max(width, 160), 48)
+    pixmap.fill(QColor(255, 235, 235))
+    painter = QPainter(pixmap)
+    painter.setFont(font)
+    painter.setPen(QColor(200, 0, 0))
+    painter.drawRect(0, 0, pixmap.width() - 1, 47)
+    painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter,
+                     metrics.elidedText(text, Qt.TextElideMode.ElideRight, pixmap.width() - 16))
+    painter.end()
+    return pixmap
+
+
+class RenderPool(QObject):
+    """Renders equations on worker threads (or processes) and hands the results back to the GUI thread.
+
+    matplotlib work is serialised by matplotlib_lock, so the thread pool defaults to a single worker.
+    Use processes=True to render on several cores at once.
+
+    A thread pool also makes the print outlines (math_path) of every mathtext equation it is asked
+    for, after the renders waiting ahead of them, so exporting does not have to.
+    """
+
+    # Emitted from the worker, delivered to the GUI thread through a queued connection
+    _rendered = pyqtSignal(str, object)
+    _batch_rendered = pyqtSignal(object, object)
+    # An equation could not be rendered: its text and the error. It is shown as error_pixmap and,
+    # as that is not cached, rendered again the next time it is requested.
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, cache=None, max_workers=1, processes=False, parent=None):
+        super().__init__(parent)
+        self.cache = cache if cache is not None else default_cache()
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mrender")
+        self._waiting = {}
+        self._batches = 0
+        # Outlines only reach the GUI thread through the module's path cache, so not from processes
+        self._outlines = set() if not processes else None
+        self._rendered.connect(self._on_rendered, Qt.ConnectionType.QueuedConnection)
+        self._batch_rendered.connect(self._on_batch_rendered, Qt.ConnectionType.QueuedConnection)
+
+    def request(self, text, callback, size=FONT_SIZE, dpi=DPI, render=None):
+        """Call callback(pixmap) on the GUI thread once the equation is available.
+
+        Cached equations are delivered straight away. Identical requests that are already being
+        rendered share the same job. render replaces render_png for text that is not mathtext,
+        such as graphs.
+        """
+        pixmap = self.cache.get(text, size, dpi)
+        key = cache_key(text, size, dpi)
+        if pixmap is not None:
+            callback(pixmap)
+        elif key in self._waiting:
+            self._waiting[key][3].append(callback)
+        else:
+            self.cache.misses += 1
+            self._waiting[key] = (text, size, dpi, [callback])
+            future = self._executor.submit(render or render_png, text, size, dpi)
+            future.add_done_callback(lambda f, key=key: self._rendered.emit(key, f))
+        if render is None:
+            self._prepare_paths([text], size, dpi)
+
+    def request_many(self, texts, callback, size=FONT_SIZE, dpi=DPI, render=None):
+        """Call callback({text: pixmap}) on the GUI thread once every equation is available.
+
+        The equations that are not cached are rendered together in one job, rather than one job
+        and one trip back to the GUI thread for each of them.
+        """
+        pixmaps, missing = {}, []
+        for text in dict.fromkeys(texts):
+            pixmap = self.cache.get(text, size, dpi)
+            if pixmap is None:
+                missing.append(text)
+            else:
+                pixmaps[text] = pixmap
+        if not missing:
+            callback(pixmaps)
+        else:
+            self.cache.misses += len(missing)
+            self._batches += 1
+            future = self._executor.submit(render_all, missing, size, dpi, render)
+            future.add_done_callback(lambda f: self._batch_rendered.emit((missing, size, dpi, pixmaps, callback), f))
+        if render is None:
+            self._prepare_paths(texts, size, dpi)
+
+    def warm_up(self):
+        """Load matplotlib on a worker in the background."""
+        return self._executor.submit(warm_up)
+
+    def pending(self):
+        """Number of equations, batches of them and outline jobs still being worked on."""
+        return len(self._waiting) + self._batches + len(self._outlines or ())
+
+    def _prepare_paths(self, texts, size, dpi):
+        if self._outlines is None:
+            return
+        texts = [text for text in dict.fromkeys(texts) if text and not has_path(text, size, dpi)]
+        if texts:
+            future = self._executor.submit(make_paths, texts, size, dpi)
+            self._outlines.add(future)
+            future.add_done_callback(self._outlines.discard)
+
+    def _on_rendered(self, key, future):
+        text, size, dpi, callbacks = self._waiting.pop(key)
+        try:
+            pixmap = self.cache.put(text, future.result(), size, dpi)
+        except Exception as e:
+            pixmap = self._failed(text, f"{type(e).__name__}: {e}")
+        for callback in callbacks:
+            try:
+                callback(pixmap)
+            except RuntimeError:
+                # The item was deleted while its equation was rendering
+                pass
+
+    def _on_batch_rendered(self, request, future):
+        texts, size, dpi, pixmaps, callback = request
+        self._batches -= 1
+        try:
+            results = future.result()
+        except Exception as e:
+            # The whole job failed, a worker process may have died
+            results = [f"{type(e).__name__}: {e}"] * len(texts)
+        for text, png in zip(texts, results):
+            if isinstance(png, str):
+                pixmaps[text] = self._failed(text, png)
+            else:
+                pixmaps[text] = self.cache.put(text, png, size, dpi)
+        callback(pixmaps)
+
+    def _failed(self, text, message):
+        print(f"Could not render {text!r}: {message}")
+        self.failed.emit(text, message)
+        return error_pixmap(text)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_pool = None
+
+
+def default_pool():
+    """The render pool shared by every EditableTextItem in the application."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = RenderPool()
+    return _default_pool
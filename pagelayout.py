@@ -0,0 +1,127 @@
+from collections import namedtuple
+
+# Where an item goes: the page index, the top left corner of the item and its question number
+Placement = namedtuple("Placement", "page x y number")
+
+# Where a shelf begins if it fits on the page: page index and the y below the shelf before it
+_Cursor = namedtuple("_Cursor", "page y")
+
+
+class ShelfLayout:
+    """Flows items of known size onto fixed size pages.
+
+    Items are placed in shelves (rows) of up to `columns` items, left to right, and shelves are
+    stacked top to bottom. When a shelf does not fit on a page it moves to the top of the next one.
+    Each item gets a number and a gutter of number_width on its left for it. An item too wide for
+    a column gets a shelf of its own, across the whole page; items wider than max_item_width have
+    to be scaled down by the caller.
+
+    The cursor before every shelf is remembered, so after an insert, removal or resize only the
+    items from the changed shelf onward are placed again, giving the same placements as set_sizes.
+    """
+
+    def __init__(self, width=794, height=1123, margin=60, columns=1, gap=24, number_width=40, bottom=60):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.columns = columns
+        self.gap = gap
+        self.number_width = number_width
+        self.bottom = bottom
+        self.sizes = []
+        self.placements = []
+        # Cursor before each shelf, plus one after the last. The page break test is made again
+        # when flowing resumes, so a shelf moves back up a page when the shelves above it shrink.
+        self._cursors = [_Cursor(0, margin)]
+        self._starts = []  # index of the first item of each shelf
+        self._shelf_of = []  # shelf of each item
+
+    @property
+    def column_width(self):
+        usable = self.width - 2 * self.margin - (self.columns - 1) * self.gap
+        return usable / self.columns
+
+    @property
+    def max_item_width(self):
+        """Widest item that fits on a page, right of its number."""
+        return self.width - 2 * self.margin - self.number_width
+
+    def _wide(self, size):
+        return self.columns > 1 and size[0] > self.column_width - self.number_width
+
+    @property
+    def page_count(self):
+        return self.placements[-1].page + 1 if self.placements else 0
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def set_sizes(self, sizes):
+        """Replace every item and lay them all out. Returns the placements."""
+        self.sizes = [tuple(size) for size in sizes]
+        self.placements = []
+        self._cursors = [_Cursor(0, self.margin)]
+        self._starts = []
+        self._shelf_of = []
+        self._flow(0)
+        return self.placements
+
+    def append(self, size):
+        return self.insert(len(self.sizes), size)
+
+    def insert(self, index, size):
+        """Insert an item before index. Returns the first index whose placement may have changed."""
+        self.sizes.insert(index, tuple(size))
+        return self._flow(self._resume_shelf(index))
+
+    def remove(self, index):
+        del self.sizes[index]
+        return self._flow(self._resume_shelf(index))
+
+    def resize(self, index, size):
+        size = tuple(size)
+        if self.sizes[index] == size:
+            return len(self.sizes)
+        self.sizes[index] = size
+        return self._flow(self._resume_shelf(index))
+
+    def _resume_shelf(self, index):
+        # A change can let the item join the shelf before it, or take a wide item off that shelf,
+        # so flowing starts again from the shelf of the item before the change
+        index = min(index, len(self._shelf_of))
+        return self._shelf_of[index - 1] if index > 0 else 0
+
+    def _flow(self, shelf):
+        """Place the items of shelf and every one after it. Returns the index of its first item."""
+        start = self._starts[shelf] if shelf < len(self._starts) else 0
+        del self.placements[start:]
+        del self._shelf_of[start:]
+        del self._starts[shelf:]
+        del self._cursors[shelf + 1:]
+        cursor = self._cursors[shelf]
+
+        bottom = self.height - self.bottom
+        column_width = self.column_width
+        index = start
+        while index < len(self.sizes):
+            # A wide item is alone on its shelf, and ends the shelf before it
+            end = index + 1
+            if not self._wide(self.sizes[index]):
+                while end < min(index + self.columns, len(self.sizes)) and not self._wide(self.sizes[end]):
+                    end += 1
+            row = self.sizes[index:end]
+            shelf_height = max(height for _, height in row)
+            page, y = cursor
+            if y + shelf_height > bottom and y > self.margin:
+                # Start a new page, unless the shelf is already at the top of one
+                page, y = page + 1, self.margin
+
+            for column in range(len(row)):
+                x = self.margin + column * (column_width + self.gap)
+                self.placements.append(Placement(page, x + self.number_width, y, index + column + 1))
+            self._starts.append(index)
+            self._shelf_of.extend([len(self._starts) - 1] * len(row))
+            index += len(row)
+            cursor = _Cursor(page, y + shelf_height + self.gap)
+            self._cursors.append(cursor)
+        return start
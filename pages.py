@@ -0,0 +1,330 @@
+import os
+
+from PyQt6.QtCore import QEvent, QObject, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter
+from PyQt6.QtWidgets import QGraphicsItem, QGraphicsScene, QGraphicsView, QSizePolicy, QVBoxLayout, QWidget
+
+import instrument
+import pdfexport
+
+# A4 at 96 DPI. The view is a little taller than the scene to leave room for its border.
+PAGE_WIDTH, PAGE_HEIGHT = 794, 1123
+VIEW_HEIGHT = 1150
+
+SELECTED_STYLE = "border: 2px solid blue"
+
+# Pages within this distance of the visible area keep a real view, so scrolling never shows a blank page
+PRELOAD_MARGIN = VIEW_HEIGHT
+
+# Pixmap memory that pages without a view may hold before their pixmaps are released
+PIXMAP_BUDGET = 128 * 1024 * 1024
+
+# Milliseconds after the last scroll before the pixmap budget is checked
+RELEASE_DELAY = 500
+
+# Performance mode, for pages crowded with equations: while an item is dragged the items on its page
+# are cached as device pixmaps, views repaint one bounding rectangle without antialiasing, and drags
+# move an item once per event loop pass. Nothing is cached outside a drag, as the views PageList
+# creates while scrolling would each have to fill their caches again. Turn it on with
+# SAT_PERFORMANCE_MODE or Tools > Performance Mode.
+_performance_mode = bool(os.environ.get("SAT_PERFORMANCE_MODE"))
+
+
+def performance_mode():
+    return _performance_mode
+
+
+def set_performance_mode(on):
+    """Switch performance mode for views set up from now on, see configure_view."""
+    global _performance_mode
+    _performance_mode = on
+
+
+def configure_view(view):
+    """Set up a page view for the current mode."""
+    fast = _performance_mode
+    view.setRenderHint(QPainter.RenderHint.Antialiasing, not fast)
+    view.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+    # Many small dirty regions cost more to clip than repainting the rectangle around them
+    view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate if fast
+                               else QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+    view.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing, fast)
+    view.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState, fast)
+
+
+def page_changed(item):
+    """Drop the export snapshot of the page item is on, if it is on one."""
+    scene = item.scene()
+    if isinstance(scene, PageScene):
+        scene.mark_dirty()
+
+
+class PageScene(QGraphicsScene):
+    """A page of the document that remembers whether it has changed since it was last exported.
+
+    The last snapshot of the page is kept as a QPicture. Adding, moving or removing an item drops it,
+    so only pages that changed are rendered again on the next export. Items call page_changed when
+    they move or their equation changes; the scene's changed signal is not used, because releasing
+    and restoring pixmaps redraws a page without changing what is exported.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snapshot = None
+        # Items seldom move, so a BSP tree keeps finding the items to paint or under the mouse cheap
+        # however many a page holds
+        self.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+        # Called once with the scene the first time it is shown, used to load pages lazily
+        self.loader = None
+
+    @property
+    def dirty(self):
+        return self._snapshot is None
+
+    def mark_dirty(self):
+        self._snapshot = None
+
+    def addItem(self, item):
+        with instrument.span("scene.addItem"):
+            super().addItem(item)
+        self.mark_dirty()
+
+    def removeItem(self, item):
+        super().removeItem(item)
+        self.mark_dirty()
+
+    def materialize(self):
+        """Run the pending loader, if any. Called when the page gets a view."""
+        if self.loader is not None:
+            loader, self.loader = self.loader, None
+            loader(self)
+
+    def cache_items(self, on):
+        """Paint the equations from cached pixmaps instead of their Python paint, for the length of a drag."""
+        mode = QGraphicsItem.CacheMode.DeviceCoordinateCache if on else QGraphicsItem.CacheMode.NoCache
+        for item in self.items():
+            if hasattr(item, "release_pixmap"):
+                item.setCacheMode(mode)
+
+    def pixmap_bytes(self):
+        """Memory held by the equation pixmaps on this page."""
+        return sum(item.pixmap_bytes() for item in self.items() if hasattr(item, "pixmap_bytes"))
+
+    def release_pixmaps(self):
+        """Drop the equation pixmaps of a page nobody is looking at. They come back from the render cache."""
+        for item in self.items():
+            if hasattr(item, "release_pixmap"):
+                item.release_pixmap()
+
+    def restore_pixmaps(self):
+        for item in self.items():
+            if hasattr(item, "restore_pixmap"):
+                item.restore_pixmap()
+
+    def snapshot(self):
+        """The page as a (QPicture, scene rect) pair, only rendered again if the page is dirty."""
+        if self._snapshot is None:
+            self._snapshot = pdfexport.snapshot(self)
+        return self._snapshot
+
+
+class SelectableGraphicsView(QGraphicsView):
+    def __init__(self, scene, parent=None):
+        super().__init__(scene, parent)
+        configure_view(self)
+
+        # Hide the scrollbars
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+
+    def mouseDoubleClickEvent(self, event):
+        # Select the page this view shows
+        slot = self.parent()
+        slot.page_list.select(slot)
+
+        # Call the superclass implementation
+        super().mouseDoubleClickEvent(event)
+
+
+class PageSlot(QWidget):
+    """Fixed size place holder for one page in a PageList.
+
+    The slot always holds the page's scene, but only creates a SelectableGraphicsView for it while the
+    page is close to the visible part of the scroll area.
+    """
+
+    def __init__(self, page_list, scene, name, parent=None):
+        super().__init__(parent)
+        self.page_list = page_list
+        self._scene = scene
+        self.view = None
+        self.selected = False
+        self.setObjectName(name)
+
+        # Set the size to A4 dimensions (in pixels at 96 DPI)
+        self.setFixedSize(PAGE_WIDTH, VIEW_HEIGHT)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def scene(self):
+        return self._scene
+
+    def attach(self):
+        """Create the real view for this page."""
+        if self.view is not None:
+            return
+        self._scene.materialize()
+        self._scene.restore_pixmaps()
+        self.view = SelectableGraphicsView(self._scene, self)
+        self.view.setFixedSize(PAGE_WIDTH, VIEW_HEIGHT)
+        self.view.setObjectName(self.objectName())
+        self.view.setStyleSheet(SELECTED_STYLE if self.selected else "")
+        self.layout().addWidget(self.view)
+
+    def detach(self):
+        """Throw the view away. The scene and everything on it is kept."""
+        if self.view is None:
+            return
+        self.layout().removeWidget(self.view)
+        self.view.setParent(None)
+        self.view.deleteLater()
+        self.view = None
+
+    def setSelected(self, selected):
+        self.selected = selected
+        if self.view is not None:
+            self.view.setStyleSheet(SELECTED_STYLE if selected else "")
+
+
+class PageList(QObject):
+    """The pages shown in one scroll area, with views only for the pages near the viewport."""
+
+    pageSelected = pyqtSignal(object)
+
+    def __init__(self, scroll_area, contents, virtual=True, parent=None):
+        super().__init__(parent)
+        self.scroll_area = scroll_area
+        self.contents = contents
+        self.virtual = virtual
+        self.slots = []
+
+        # Create a layout for the contents if it doesn't have one
+        if contents.layout() is None:
+            contents.setLayout(QVBoxLayout())
+            contents.layout().setAlignment(Qt.AlignmentFlag.AlignCenter)  # Center the layout
+
+        # Several scroll or resize events in a row only update the views once
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self.update_views)
+        self._attached = set()
+
+        # Checking the pixmap budget means looking at every page, so only do it once scrolling stops
+        self._release_timer = QTimer(self)
+        self._release_timer.setSingleShot(True)
+        self._release_timer.timeout.connect(self.release_pixmaps)
+        scroll_area.verticalScrollBar().valueChanged.connect(self.schedule_update)
+        scroll_area.verticalScrollBar().rangeChanged.connect(self.schedule_update)
+        scroll_area.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() in (QEvent.Type.Resize, QEvent.Type.Show):
+            self.schedule_update()
+        return False
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, index):
+        return self.slots[index]
+
+    def scenes(self):
+        return [slot.scene() for slot in self.slots]
+
+    def add_page(self, scene, name):
+        slot = PageSlot(self, scene, name)
+        self.contents.layout().addWidget(slot)
+        self.slots.append(slot)
+        if not self.virtual:
+            slot.attach()
+            self._attached.add(slot)
+        self.schedule_update()
+        return slot
+
+    def remove_last(self):
+        slot = self.slots.pop()
+        self._attached.discard(slot)
+        slot.detach()
+        self.contents.layout().removeWidget(slot)
+        slot.setParent(None)
+        slot.deleteLater()
+        self.schedule_update()
+        return slot
+
+    def select(self, slot):
+        for other in self.slots:
+            if other is not slot and other.selected:
+                other.setSelected(False)
+        if slot is not None:
+            slot.setSelected(True)
+        self.pageSelected.emit(slot)
+
+    def deselect_all(self):
+        for slot in self.slots:
+            if slot.selected:
+                slot.setSelected(False)
+
+    def selected(self):
+        for slot in self.slots:
+            if slot.selected:
+                return slot
+        return None
+
+    def schedule_update(self, *args):
+        if self.virtual:
+            self._update_timer.start(0)
+
+    def configure_views(self):
+        """Set the views that exist up again, after performance mode was switched."""
+        for slot in self.slots:
+            if slot.view is not None:
+                configure_view(slot.view)
+
+    def live_views(self):
+        """Number of pages that currently have a real view."""
+        return sum(1 for slot in self.slots if slot.view is not None)
+
+    def update_views(self):
+        """Create views for pages near the viewport and remove the others."""
+        if not self.virtual or not self.slots:
+            return
+        top = self.scroll_area.verticalScrollBar().value() - PRELOAD_MARGIN
+        bottom = top + self.scroll_area.viewport().height() + 2 * PRELOAD_MARGIN
+
+        # Every page has the same height, so the visible range follows from the first page's position
+        pitch = VIEW_HEIGHT + max(self.contents.layout().spacing(), 0)
+        first_y = self.slots[0].y()
+        first = max(0, (top - first_y) // pitch)
+        last = min(len(self.slots) - 1, (bottom - first_y) // pitch)
+        wanted = set(self.slots[first:last + 1])
+
+        for slot in self._attached - wanted:
+            slot.detach()
+        for slot in wanted - self._attached:
+            slot.attach()
+        self._attached = wanted
+        self._release_timer.start(RELEASE_DELAY)
+
+    def release_pixmaps(self):
+        """Release the pixmaps of the pages furthest from the viewport until they fit in PIXMAP_BUDGET."""
+        if not self._attached:
+            return
+        middle = sum(self.slots.index(slot) for slot in self._attached) / len(self._attached)
+        hidden = [(abs(i - middle), slot) for i, slot in enumerate(self.slots) if slot not in self._attached]
+        used = sum(slot.scene().pixmap_bytes() for _, slot in hidden)
+        for _, slot in sorted(hidden, key=lambda pair: pair[0], reverse=True):
+            if used <= PIXMAP_BUDGET:
+                break
+            used -= slot.scene().pixmap_bytes()
+            slot.scene().release_pixmaps()
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+
+from PyQt6.QtCore import QMarginsF, QObject, QRectF, QTimer, pyqtSignal
+from PyQt6.QtGui import QPageLayout, QPageSize, QPainter, QPdfWriter, QPicture
+from PyQt6.QtWidgets import QGraphicsItem
+
+import instrument
+
+# Pages waiting to be written. Keeping this small keeps memory flat however long the document is.
+QUEUE_SIZE = 2
+
+
+def snapshot(scene):
+    """Record a scene into a QPicture. Must run on the GUI thread."""
+    # Items cached for performance mode would be recorded from their screen pixmaps, so their own
+    # paint, which draws vector outlines, is used while recording
+    cached = [(item, item.cacheMode()) for item in scene.items()
+              if item.cacheMode() != QGraphicsItem.CacheMode.NoCache]
+    for item, _ in cached:
+        item.setCacheMode(QGraphicsItem.CacheMode.NoCache)
+    try:
+        with instrument.span("pdf snapshot"):
+            picture = QPicture()
+            painter = QPainter(picture)
+            rect = scene.sceneRect()
+            scene.render(painter, QRectF(0, 0, rect.width(), rect.height()), rect)
+            painter.end()
+    finally:
+        for item, mode in cached:
+            item.setCacheMode(mode)
+    return picture, rect
+
+
+class PdfExport(QObject):
+    """Writes a list of page scenes to a PDF without blocking the GUI.
+
+    The GUI thread snapshots one page at a time into a QPicture between events, and a writer thread
+    plays each picture onto the PDF as soon as it arrives. Pages that have not changed reuse their
+    last snapshot, but every page is still played onto the new file. Connect to progress, finished
+    and failed, then call start().
+    """
+
+    progress = pyqtSignal(int, int)  # pages written, total pages
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, scenes, path, parent=None):
+        super().__init__(parent)
+        self.scenes = list(scenes)
+        self.path = path
+        self._pages = queue.Queue(maxsize=QUEUE_SIZE)
+        self._cancelled = threading.Event()
+        self._next = 0
+        self._thread = threading.Thread(target=self._write, name="pdf-export", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        QTimer.singleShot(0, self._snapshot_next)
+
+    def cancel(self):
+        """Stop after the current page and remove the partly written file."""
+        self._cancelled.set()
+
+    def _snapshot_next(self):
+        if self._cancelled.is_set() or self._next == len(self.scenes):
+            # Tell the writer there is nothing more to come
+            self._put(None)
+            return
+        if self._pages.full():
+            # The writer is behind, try again shortly instead of holding another page in memory
+            QTimer.singleShot(5, self._snapshot_next)
+            return
+
+        scene = self.scenes[self._next]
+        try:
+            # Page scenes keep their last snapshot and only render again when they changed
+            page = scene.snapshot() if hasattr(scene, "snapshot") else snapshot(scene)
+            self._pages.put_nowait(page)
+        except RuntimeError:
+            # The page was deleted while exporting
+            pass
+        self._next += 1
+        QTimer.singleShot(0, self._snapshot_next)
+
+    def _put(self, page):
+        if not self._thread.is_alive():
+            return
+        try:
+            self._pages.put_nowait(page)
+        except queue.Full:
+            QTimer.singleShot(5, lambda: self._put(page))
+
+    def _write(self):
+        try:
+            writer = QPdfWriter(self.path)
+            writer.setResolution(96)
+            writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+            writer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Unit.Point)
+            page_rect = writer.pageLayout().paintRectPixels(writer.resolution())
+
+            painter = QPainter(writer)
+            written = 0
+            while True:
+                page = self._pages.get()
+                if page is None or self._cancelled.is_set():
+                    break
+                picture, rect = page
+                if written:
+                    writer.newPage()
+                # Fit the page scene onto the paper the same way QGraphicsScene.render does
+                scale = min(page_rect.width() / rect.width(), page_rect.height() / rect.height())
+                with instrument.span("pdf page"):
+                    painter.save()
+                    painter.scale(scale, scale)
+                    painter.drawPicture(0, 0, picture)
+                    painter.restore()
+                written += 1
+                self.progress.emit(written, len(self.scenes))
+            painter.end()
+        except Exception as e:
+            self._cancelled.set()
+            self.failed.emit(str(e))
+            return
+
+        if self._cancelled.is_set():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.failed.emit("Export cancelled")
+        else:
+            self.finished.emit(self.path)
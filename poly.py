@@ -0,0 +1,183 @@
+def format_terms(terms):
+    """Join (coefficient, monomial) pairs into '3x^2 - x + 4' style text.
+
+    Zero terms are dropped, unit coefficients are hidden and negative terms are written with ' - '.
+    A monomial of '' is a constant.
+    """
+    parts = []
+    for coef, monomial in terms:
+        if coef == 0:
+            continue
+        size = abs(coef)
+        if monomial == "":
+            body = str(size)
+        elif size == 1:
+            body = monomial
+        else:
+            body = f"{size}{monomial}"
+        if not parts:
+            parts.append(f"-{body}" if coef < 0 else body)
+        else:
+            parts.append(f"- {body}" if coef < 0 else f"+ {body}")
+    return " ".join(parts) if parts else "0"
+
+
+def coefficient_prefix(coef):
+    """Text written in front of a variable for a coefficient, e.g. '' for 1 and '-' for -1."""
+    if coef == 1:
+        return ""
+    if coef == -1:
+        return "-"
+    return str(coef)
+
+
+def power(var, n, latex=False):
+    """Text of var raised to the n-th power."""
+    if n == 0:
+        return ""
+    if n == 1:
+        return var
+    return f"{var}^{{{n}}}" if latex else f"{var}^{n}"
+
+
+class Poly:
+    """Polynomial in one variable with integer coefficients.
+
+    Coefficients are stored lowest degree first, so Poly([2, 3, 1]) is x^2 + 3x + 2.
+    """
+
+    __slots__ = ("coeffs", "var")
+
+    def __init__(self, coeffs, var="x"):
+        coeffs = [int(c) for c in coeffs]
+        while coeffs and coeffs[-1] == 0:
+            coeffs.pop()
+        self.coeffs = tuple(coeffs)
+        self.var = var
+
+    @classmethod
+    def linear(cls, a, b, var="x"):
+        """The polynomial a*var + b."""
+        return cls([b, a], var)
+
+    @classmethod
+    def monomial(cls, coef, n=1, var="x"):
+        """The polynomial coef*var^n."""
+        return cls([0] * n + [coef], var)
+
+    @property
+    def degree(self):
+        return len(self.coeffs) - 1
+
+    def coeff(self, n):
+        """Coefficient of var^n."""
+        return self.coeffs[n] if 0 <= n < len(self.coeffs) else 0
+
+    def _check(self, other):
+        if isinstance(other, int):
+            return Poly([other], self.var)
+        if not isinstance(other, Poly):
+            return NotImplemented
+        if self.degree > 0 and other.degree > 0 and other.var != self.var:
+            raise ValueError(f"Cannot combine polynomials in {self.var} and {other.var}")
+        return other
+
+    def _var(self, other):
+        # Constants take the variable of whatever they are combined with
+        return self.var if self.degree > 0 else other.var
+
+    def __add__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        size = max(len(self.coeffs), len(other.coeffs))
+        return Poly([self.coeff(i) + other.coeff(i) for i in range(size)], self._var(other))
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Poly([-c for c in self.coeffs], self.var)
+
+    def __sub__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        other = self._check(other)
+        if other is NotImplemented:
+            return other
+        if not self.coeffs or not other.coeffs:
+            return Poly([], self._var(other))
+        result = [0] * (len(self.coeffs) + len(other.coeffs) - 1)
+        for i, a in enumerate(self.coeffs):
+            if a:
+                for j, b in enumerate(other.coeffs):
+                    result[i + j] += a * b
+        return Poly(result, self._var(other))
+
+    __rmul__ = __mul__
+
+    def __pow__(self, n):
+        result = Poly([1], self.var)
+        for _ in range(n):
+            result = result * self
+        return result
+
+    def __eq__(self, other):
+        if isinstance(other, int):
+            other = Poly([other], self.var)
+        if not isinstance(other, Poly):
+            return NotImplemented
+        return self.coeffs == other.coeffs and (self.degree < 1 or self.var == other.var)
+
+    def __hash__(self):
+        return hash((self.coeffs, self.var if self.degree > 0 else None))
+
+    def __call__(self, value):
+        result = 0
+        for c in reversed(self.coeffs):
+            result = result * value + c
+        return result
+
+    def terms(self, latex=False):
+        """(coefficient, monomial text) pairs from the highest power down."""
+        return [(c, power(self.var, n, latex)) for n, c in reversed(list(enumerate(self.coeffs)))]
+
+    def to_text(self):
+        """Plain text such as 'x^2 - 3x + 2'."""
+        return format_terms(self.terms())
+
+    def to_latex(self):
+        """LaTeX such as 'x^{2} - 3x + 2'."""
+        return format_terms(self.terms(latex=True))
+
+    def __str__(self):
+        return self.to_text()
+
+    def __repr__(self):
+        return f"Poly({list(self.coeffs)!r}, {self.var!r})"
+
+    def to_sympy(self):
+        """The same polynomial as a sympy expression, for cross-checking and the sympy topics."""
+        import sympy as sp
+        x = sp.Symbol(self.var)
+        return sum((c * x ** n for n, c in enumerate(self.coeffs)), sp.Integer(0))
+
+
+def sympy_parse(text):
+    """Parse question text such as '(3x + 2)(x - 1)' or 'x^2 - 3x' with sympy."""
+    from sympy.parsing.sympy_parser import (convert_xor, implicit_multiplication_application,
+                                            parse_expr, standard_transformations)
+    transformations = standard_transformations + (implicit_multiplication_application, convert_xor)
+    return parse_expr(text, transformations=transformations)
+
+
+def check_with_sympy(original_text, expanded_text):
+    """Use sympy to confirm that expanded_text really is the expansion of original_text."""
+    import sympy as sp
+    return sp.expand(sympy_parse(original_text) - sympy_parse(expanded_text)) == 0
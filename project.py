@@ -0,0 +1,97 @@
+"""Worksheet project files.
+
+A project is a zip holding project.json and, optionally, the rendered equation images:
+
+    project.json           page counts and one row per question
+    renders/<key>.png      rendered equations named by mrender.cache_key
+
+Questions are stored as rows of FIELDS rather than one object each, which keeps big projects small.
+Every question keeps the seed it was generated from, so it can be generated again exactly.
+"""
+import json
+import os
+import zipfile
+
+import mrender
+import topics
+
+FORMAT_VERSION = 1
+FIELDS = ("topic", "difficulty", "text", "answer", "seed", "page", "x", "y", "width", "height",
+          "answer_width", "answer_height")
+
+
+def cached_renders(texts, cache=None):
+    """PNGs of the equations that are already in the render cache, keyed by text."""
+    cache = cache if cache is not None else mrender.default_cache()
+    renders = {}
+    for text in texts:
+        png = cache.png(text)
+        if png is not None:
+            renders[text] = png
+    return renders
+
+
+def save(path, pages, questions, renders=None):
+    """Write a project.
+
+    pages is a dict of page counts ({"title": 1, "questions": 4, "answers": 1}) and questions a
+    list of dicts with the keys in FIELDS. renders maps equation text to PNG bytes to embed, so
+    opening the project does not render them again. By default it is whatever the render cache
+    already holds, pass {} to leave the images out.
+    """
+    if renders is None:
+        renders = cached_renders({question["text"] for question in questions})
+    rows = [[topics.encode_answer(question[field]) if field == "answer" else question[field] for field in FIELDS]
+            for question in questions]
+    document = {"version": FORMAT_VERSION, "pages": pages, "fields": FIELDS, "questions": rows}
+
+    # Write to a temporary file first so a failed save never destroys the previous project
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("project.json", json.dumps(document, separators=(",", ":")))
+            for text, png in sorted(renders.items()):
+                # PNGs are already compressed
+                archive.writestr(f"renders/{mrender.cache_key(text)}.png", png, zipfile.ZIP_STORED)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Project:
+    """An opened project file.
+
+    The question rows are read straight away, the embedded images only when renders() asks for them.
+    The file is not held open in between, so it can be saved over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            document = json.loads(archive.read("project.json"))
+            self._renders = {name for name in archive.namelist() if name.startswith("renders/")}
+        if document.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"{path} was saved by a newer version")
+
+        self.pages = document["pages"]
+        fields = document["fields"]
+        self.questions = []
+        for row in document["questions"]:
+            question = dict(zip(fields, row))
+            question["answer"] = topics.decode_answer(question["answer"])
+            self.questions.append(question)
+
+    def renders(self, texts):
+        """The embedded images of these equations, keyed by text. Equations without one are left out."""
+        names = {text: f"renders/{mrender.cache_key(text)}.png" for text in texts}
+        names = {text: name for text, name in names.items() if name in self._renders}
+        if not names:
+            return {}
+        with zipfile.ZipFile(self.path) as archive:
+            return {text: archive.read(name) for text, name in names.items()}
+
+
+def load(path):
+    return Project(path)
@@ -0,0 +1,197 @@
+"""A question bank: questions generated ahead of time into a SQLite file.
+
+    python qbank.py --out questions.db --count 20000 --seed 1 [--images]
+
+builds the bank. Each topic and difficulty is stored as one block of consecutive row ids, noted in
+the blocks table, so drawing n different questions is a seeded choice of n ids and one query on the
+primary key. Rows also keep the coefficients, the canonical hash and, with --images, the rendered
+question so the GUI does not render it either.
+
+farm.py and the GUI use the bank through topics.draw and topics.draw_each when questions.db (or SAT_QUESTION_BANK) exists.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import Crand
+import mgen
+import topics
+
+DEFAULT_PATH = os.environ.get("SAT_QUESTION_BANK",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.db"))
+
+# SQLite limits the number of parameters in one statement
+QUERY_CHUNK = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    coefficients TEXT,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    image BLOB
+);
+CREATE UNIQUE INDEX IF NOT EXISTS questions_key ON questions (topic, difficulty, hash);
+CREATE TABLE IF NOT EXISTS blocks (
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    first_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (topic, difficulty)
+);
+"""
+
+
+def text_hash(text):
+    """64 bit hash of a question's text, for topics without coefficient columns."""
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little", signed=True)
+
+
+def bank_rows(code, difficulty, n, rng):
+    """Up to n different questions as (hash, coefficients, question, answer) tuples."""
+    if (code, difficulty) in mgen.BATCH_SPECS:
+        available = mgen.question_count(code, difficulty)
+        batch = mgen.generate_distinct(code, difficulty, min(n, available) if available else n, rng)
+        hashes = batch.hashes().tolist()
+        return [(hashes[i], json.dumps(batch.values(i)), *batch.row(i)[1:]) for i in range(len(batch))]
+
+    # Other topics are told apart by their text
+    rows, seen = [], set()
+    for _, question, answer in topics.get(code).batch(difficulty, n, rng):
+        if question not in seen:
+            seen.add(question)
+            rows.append((text_hash(question), None, question, answer))
+    return rows
+
+
+class QuestionBank:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._blocks = None
+
+    def close(self):
+        self.connection.close()
+
+    def blocks(self):
+        """(topic, difficulty) -> (first id, count) of every block in the bank."""
+        if self._blocks is None:
+            self._blocks = {(topic, difficulty): (first_id, count) for topic, difficulty, first_id, count
+                            in self.connection.execute("SELECT topic, difficulty, first_id, count FROM blocks")}
+        return self._blocks
+
+    def count(self, topic, difficulty):
+        return self.blocks().get((topic, difficulty), (0, 0))[1]
+
+    def build(self, topic, difficulty, n, rng=None, render=None):
+        """Replace the block of a topic and difficulty with up to n new questions.
+
+        render(text) returns PNG bytes to store with each question, or None to store no images.
+        Returns the number of questions stored.
+        """
+        rng = Crand.sampler(rng)
+        rows = bank_rows(topic, difficulty, n, rng)
+        with self.connection:
+            self.connection.execute("DELETE FROM questions WHERE topic = ? AND difficulty = ?", (topic, difficulty))
+            first_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM questions").fetchone()[0]
+            self.connection.executemany(
+                "INSERT INTO questions (id, topic, difficulty, hash, coefficients, question, answer, image) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((first_id + i, topic, difficulty, key, coefficients, question,
+                  json.dumps(topics.encode_answer(answer)), render(question) if render else None)
+                 for i, (key, coefficients, question, answer) in enumerate(rows)))
+            self.connection.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)",
+                                    (topic, difficulty, first_id, len(rows)))
+        self._blocks = None
+        return len(rows)
+
+    def sample(self, topic, difficulty, n, rng=None, cache=None):
+        """n different questions as (difficulty, question, answer) rows, the same for the same seed.
+
+        Images stored with the questions are put in cache, a RenderCache, when one is given.
+        """
+        first_id, count = self.blocks().get((topic, difficulty), (0, 0))
+        if n > count:
+            raise ValueError(f"The question bank has {count} {topic} {difficulty} questions, but {n} were requested")
+        rng = Crand.sampler(rng)
+        ids = (rng.rng.choice(count, size=n, replace=False) + first_id).tolist()
+        return self._fetch(difficulty, ids, cache)
+
+    def pick(self, topic, difficulty, seeds, cache=None):
+        """The question each seed picks, as (difficulty, question, answer) rows.
+
+        A seed always picks the same question from the same bank. Different seeds may pick the same one.
+        """
+        first_id, count = self.blocks().get((topic, difficulty), (0, 0))
+        if count == 0:
+            raise ValueError(f"The question bank has no {topic} {difficulty} questions")
+        ids = [first_id + Crand.Sampler(seed).randint(0, count - 1) for seed in seeds]
+        return self._fetch(difficulty, ids, cache)
+
+    def _fetch(self, difficulty, ids, cache):
+        """Rows for question ids, in their order, with a single query for every QUERY_CHUNK of them."""
+        columns = "id, question, answer" + (", image" if cache is not None else "")
+        found = {}
+        for start in range(0, len(ids), QUERY_CHUNK):
+            chunk = ids[start:start + QUERY_CHUNK]
+            query = f"SELECT {columns} FROM questions WHERE id IN ({', '.join('?' * len(chunk))})"
+            for row in self.connection.execute(query, chunk):
+                found[row[0]] = row[1:]
+
+        rows = []
+        for row_id in ids:
+            question, answer = found[row_id][:2]
+            if cache is not None and found[row_id][2] is not None:
+                cache.put(question, found[row_id][2])
+            rows.append((difficulty, question, topics.decode_answer(json.loads(answer))))
+        return rows
+
+
+_default_bank = None
+
+
+def default_bank():
+    """The bank at DEFAULT_PATH, or None if it has not been built."""
+    global _default_bank
+    if _default_bank is None and os.path.exists(DEFAULT_PATH):
+        _default_bank = QuestionBank(DEFAULT_PATH)
+    return _default_bank
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the question bank.")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    parser.add_argument("--count", type=int, default=20000, help="questions per topic and difficulty")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--topics", nargs="*", default=topics.available(), choices=topics.available())
+    parser.add_argument("--images", action="store_true", help="store the rendered questions too")
+    args = parser.parse_args(argv)
+
+    render = None
+    if args.images:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        import mrender
+
+    bank = QuestionBank(args.out)
+    sampler = Crand.Sampler(args.seed)
+    print(f"Seed {sampler.seed}")
+    start = time.perf_counter()
+    pairs = [(code, difficulty) for code in args.topics for difficulty in topics.DIFFICULTIES]
+    for (code, difficulty), child in zip(pairs, sampler.spawn(len(pairs))):
+        if args.images:
+            render = topics.get(code).render or mrender.render_png
+        stored = bank.build(code, difficulty, args.count, child, render)
+        print(f"{code} {difficulty}: {stored} questions")
+    bank.close()
+    print(f"Built {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
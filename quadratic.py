@@ -0,0 +1,241 @@
+"""Exact solutions of ax^2 + bx + c = 0 with integer coefficients, without sympy.
+
+The roots are kept as x = (p ± q√r) / d with r square-free and p, q, d sharing no factor, which is
+the form a student is expected to give. Square-free parts of the discriminant come from a table
+built once, so solving is a few integer operations and the LaTeX is written directly.
+
+    python quadratic.py --verify 20000 --seed 1
+
+checks the solver against sympy.solve on random coefficients.
+"""
+import argparse
+import math
+import time
+from fractions import Fraction
+
+import Crand
+from poly import Poly
+
+TWO = "two"
+ONE = "one"
+NONE = "none"
+
+# Square-free parts of numbers below this are looked up, larger ones are found by trial division
+TABLE_LIMIT = 10_000
+
+_table = None
+_large = {}  # n -> square root of the largest square dividing n, for n >= TABLE_LIMIT
+
+
+def _square_table():
+    """The square root of the largest square dividing n, for every n below TABLE_LIMIT."""
+    global _table
+    if _table is None:
+        table = [1] * TABLE_LIMIT
+        k = 2
+        while k * k < TABLE_LIMIT:
+            # Larger k come later, so each n ends with the largest k whose square divides it
+            for n in range(k * k, TABLE_LIMIT, k * k):
+                table[n] = k
+            k += 1
+        _table = table
+    return _table
+
+
+def square_free(n):
+    """(k, m) with n = k^2 m and m square-free, for n >= 0."""
+    if n == 0:
+        return 0, 1
+    if n < TABLE_LIMIT:
+        k = _square_table()[n]
+    else:
+        k = _large.get(n)
+        if k is None:
+            k, rest, factor = 1, n, 2
+            while factor * factor <= rest:
+                while rest % (factor * factor) == 0:
+                    rest //= factor * factor
+                    k *= factor
+                if rest % factor == 0:
+                    rest //= factor
+                factor += 1
+            _large[n] = k
+    return k, n // (k * k)
+
+
+def _fraction_latex(value):
+    if value.denominator == 1:
+        return str(value.numerator)
+    sign = "-" if value < 0 else ""
+    return rf"{sign}\frac{{{abs(value.numerator)}}}{{{value.denominator}}}"
+
+
+class QuadraticRoots:
+    """The real roots of ax^2 + bx + c = 0 in exact form."""
+
+    def __init__(self, a, b, c):
+        if a == 0:
+            raise ValueError("Not a quadratic, a is 0")
+        self.a, self.b, self.c = a, b, c
+        self.discriminant = b * b - 4 * a * c
+        if self.discriminant > 0:
+            self.kind = TWO
+        elif self.discriminant == 0:
+            self.kind = ONE
+        else:
+            self.kind = NONE
+
+        # x = (p ± q√r) / d, reduced with d > 0
+        q, r = square_free(abs(self.discriminant))
+        p, d = -b, 2 * a
+        if d < 0:
+            p, d = -p, -d
+        common = math.gcd(math.gcd(p, q), d)
+        self.p, self.q, self.radicand, self.d = p // common, q // common, r, d // common
+
+    @property
+    def rational(self):
+        """Whether the real roots are rational, so they have no surd."""
+        return self.kind != NONE and (self.kind == ONE or self.radicand == 1)
+
+    def exact(self):
+        """The rational roots as sorted Fractions, None if they are surds."""
+        if self.kind == NONE:
+            return ()
+        if not self.rational:
+            return None
+        if self.kind == ONE:
+            return (Fraction(self.p, self.d),)
+        return (Fraction(self.p - self.q, self.d), Fraction(self.p + self.q, self.d))
+
+    def values(self):
+        """The real roots as sorted floats."""
+        if self.kind == NONE:
+            return ()
+        surd = self.q * math.sqrt(self.radicand)
+        if self.kind == ONE:
+            return (self.p / self.d,)
+        return ((self.p - surd) / self.d, (self.p + surd) / self.d)
+
+    def latex(self):
+        if self.kind == NONE:
+            return r"\mathrm{no\ real\ solutions}"
+        roots = self.exact()
+        if roots is not None:
+            return r",\quad ".join(f"x = {_fraction_latex(root)}" for root in roots)
+
+        surd = rf"\sqrt{{{self.radicand}}}" if self.q == 1 else rf"{self.q}\sqrt{{{self.radicand}}}"
+        if self.p == 0:
+            numerator = rf"\pm {surd}" if self.d == 1 else rf"\pm\frac{{{surd}}}{{{self.d}}}"
+            return f"x = {numerator}"
+        numerator = rf"{self.p} \pm {surd}"
+        return f"x = {numerator}" if self.d == 1 else rf"x = \frac{{{numerator}}}{{{self.d}}}"
+
+
+def solve(a, b, c):
+    return QuadraticRoots(a, b, c)
+
+
+def discriminant_text(roots):
+    """LaTeX answer of a discriminant question: its value and how many real solutions there are."""
+    count = {TWO: "two", ONE: "one", NONE: "no"}[roots.kind]
+    plural = "" if roots.kind == ONE else "s"
+    return rf"\Delta = {roots.discriminant},\quad \mathrm{{{count}\ real\ solution{plural}}}"
+
+
+def equation_text(a, b, c):
+    return f"{Poly([c, b, a])} = 0"
+
+
+def _draw(difficulty, rng, accept=lambda roots: True):
+    """Coefficients for a difficulty, drawn again until accept(roots) holds."""
+    while True:
+        if difficulty == "Easy":
+            a, b, c = 1, rng.randint(-9, 9), rng.randint(-9, 9)
+        elif difficulty == "Medium":
+            a, b, c = rng.non_zero_randint(-5, 5), rng.randint(-9, 9), rng.randint(-9, 9)
+        else:
+            a, b, c = rng.non_zero_randint(-9, 9), rng.randint(-12, 12), rng.randint(-12, 12)
+        roots = solve(a, b, c)
+        if accept(roots):
+            return a, b, c, roots
+
+
+def generate_formula_question(difficulty, rng=None):
+    """3H: solve a quadratic with the formula. Easy and Medium ones have two real roots."""
+    rng = rng or Crand.default_sampler()
+    if difficulty not in ("Easy", "Medium", "Hard"):
+        return difficulty, "Unknown difficulty", None
+    accept = (lambda roots: True) if difficulty == "Hard" else (lambda roots: roots.kind == TWO)
+    a, b, c, roots = _draw(difficulty, rng, accept)
+    return difficulty, equation_text(a, b, c), roots.latex()
+
+
+def generate_discriminant_question(difficulty, rng=None):
+    """3I: find the discriminant and the number of real solutions."""
+    rng = rng or Crand.default_sampler()
+    if difficulty not in ("Easy", "Medium", "Hard"):
+        return difficulty, "Unknown difficulty", None
+    a, b, c, roots = _draw(difficulty, rng)
+    return difficulty, equation_text(a, b, c), discriminant_text(roots)
+
+
+def sympy_roots(roots):
+    """The same roots as sympy expressions, for checking."""
+    import sympy as sp
+
+    if roots.kind == NONE:
+        return []
+    surd = roots.q * sp.sqrt(roots.radicand)
+    if roots.kind == ONE:
+        return [sp.Rational(roots.p, roots.d)]
+    return [(roots.p - surd) / roots.d, (roots.p + surd) / roots.d]
+
+
+def verify(count, rng, bound=50):
+    """Compare count random quadratics with sympy.solve. Returns the coefficients that disagree."""
+    import sympy as sp
+
+    x = sp.Symbol("x")
+    wrong = []
+    ours = theirs = 0.0
+    for _ in range(count):
+        a, b, c = rng.non_zero_randint(-bound, bound), rng.randint(-bound, bound), rng.randint(-bound, bound)
+        start = time.perf_counter()
+        roots = solve(a, b, c)
+        roots.latex()
+        ours += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = [root for root in sp.solve(a * x ** 2 + b * x + c, x) if root.is_real]
+        theirs += time.perf_counter() - start
+
+        found = sympy_roots(roots)
+        reduced = math.gcd(math.gcd(roots.p, roots.q), roots.d) == 1
+        square_free_ok = all(power == 1 for power in sp.factorint(roots.radicand).values())
+        same = (len(found) == len(expected)
+                and all(sp.expand(mine - other) == 0
+                        for mine, other in zip(found, sorted(expected, key=float))))
+        if not (same and reduced and square_free_ok):
+            wrong.append((a, b, c))
+    print(f"{count} quadratics: {len(wrong)} wrong, {ours / count * 1e6:.1f} us each "
+          f"against {theirs / count * 1e3:.2f} ms with sympy.solve")
+    return wrong
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the exact quadratic solver against sympy.")
+    parser.add_argument("--verify", type=int, default=10_000, help="number of random quadratics")
+    parser.add_argument("--bound", type=int, default=50, help="largest coefficient")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sampler = Crand.Sampler(args.seed)
+    print(f"Seed {sampler.seed}")
+    wrong = verify(args.verify, sampler, args.bound)
+    for a, b, c in wrong[:10]:
+        print(f"Wrong: {equation_text(a, b, c)}")
+    raise SystemExit(1 if wrong else 0)
+
+
+if __name__ == '__main__':
+    main()
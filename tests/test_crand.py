@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import Crand
+
+
+def draws(sampler):
+    return ([sampler.randint(-5, 5) for _ in range(50)], sampler.randint(-5, 5, size=50).tolist(),
+            [sampler.choice(["a", "b", "c"]) for _ in range(10)])
+
+
+def test_the_same_seed_gives_the_same_draws():
+    assert draws(Crand.Sampler(1)) == draws(Crand.Sampler(1))
+    assert draws(Crand.Sampler(1)) != draws(Crand.Sampler(2))
+
+
+def test_an_unseeded_stream_can_be_repeated_from_its_seed():
+    sampler = Crand.Sampler()
+    assert draws(Crand.Sampler(sampler.seed)) == draws(sampler)
+
+
+def test_seeding_the_default_stream_repeats_it(monkeypatch):
+    # Put the application's stream back afterwards
+    monkeypatch.setattr(Crand, "_default_sampler", Crand.default_sampler())
+    Crand.seed(3)
+    first = [Crand.non_zero_randint(-5, 5) for _ in range(20)]
+    Crand.seed(3)
+    assert [Crand.non_zero_randint(-5, 5) for _ in range(20)] == first
+
+
+@pytest.mark.parametrize("exclude", [(0,), (0, 1), (-3, 3), (5,), (-5, 5)])
+def test_excluded_values_never_come_up_and_the_rest_do(exclude):
+    sampler = Crand.Sampler(4)
+    allowed = set(range(-5, 6)) - set(exclude)
+    single = {sampler.randint(-5, 5, exclude) for _ in range(2000)}
+    vectorized = set(sampler.randint(-5, 5, exclude, size=2000).tolist())
+    assert single == allowed
+    assert vectorized == allowed
+
+
+def test_non_zero_helpers():
+    sampler = Crand.Sampler(5)
+    assert 0 not in sampler.non_zero_randint(-2, 2, size=1000)
+    assert not np.isin(sampler.non_zero_one_randint(-2, 2, size=1000), [0, 1]).any()
+
+
+def test_excluding_every_value_raises():
+    with pytest.raises(ValueError):
+        Crand.Sampler(6).randint(0, 1, exclude=(0, 1))
+
+
+def test_spawned_streams_are_independent_and_reproducible():
+    children = Crand.Sampler(7).spawn(3)
+    again = Crand.Sampler(7).spawn(3)
+    results = [child.randint(0, 10 ** 9, size=20).tolist() for child in children]
+    assert results == [child.randint(0, 10 ** 9, size=20).tolist() for child in again]
+    assert len({tuple(result) for result in results}) == 3
+    # A child does not repeat its parent either
+    assert results[0] != Crand.Sampler(7).randint(0, 10 ** 9, size=20).tolist()
+
+
+def test_sampler_accepts_a_seed_or_a_sampler():
+    sampler = Crand.Sampler(8)
+    assert Crand.sampler(sampler) is sampler
+    assert draws(Crand.sampler(8)) == draws(Crand.Sampler(8))
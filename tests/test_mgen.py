@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import mgen
+from poly import Poly, check_with_sympy
+
+SPECS = sorted(mgen.BATCH_SPECS)
+
+
+@pytest.mark.parametrize("topic,difficulty", SPECS)
+def test_batch_columns_match_the_rows(topic, difficulty):
+    batch = mgen.generate_batch(topic, difficulty, 200, rng=1)
+    assert len(batch) == 200
+    assert all(len(column) == 200 for column in batch.columns.values())
+    rows = batch.rows()
+    for i in range(0, 200, 20):
+        assert rows[i] == batch.row(i)
+        assert rows[i][0] == difficulty
+
+
+@pytest.mark.parametrize("topic,difficulty", [spec for spec in SPECS if spec != ("3A", "Easy")])
+def test_vectorized_expansion_matches_poly(topic, difficulty):
+    batch = mgen.generate_batch(topic, difficulty, 500, rng=2)
+    for i in range(len(batch)):
+        values = batch.values(i)
+        expanded = Poly([values["x0"], values["x1"], values["x2"]])
+        if topic == "3A":
+            assert batch.row(i)[2] == str(expanded)
+        elif topic == "3C":
+            assert expanded == Poly.linear(1, -values["r1"]) * Poly.linear(1, -values["r2"])
+        else:
+            assert batch.row(i)[1] == str(expanded)
+
+
+@pytest.mark.parametrize("topic,difficulty", [("3A", "Easy"), ("3A", "Hard"), ("3B", "Hard")])
+def test_batch_text_matches_sympy(topic, difficulty):
+    for _, question, answer in mgen.generate_batch(topic, difficulty, 30, rng=3).rows():
+        original, expanded = (question, answer) if topic == "3A" else (answer, question)
+        assert check_with_sympy(original, expanded)
+
+
+def test_the_same_seed_gives_the_same_batch():
+    first = mgen.generate_batch("3B", "Hard", 1000, rng=4)
+    second = mgen.generate_batch("3B", "Hard", 1000, rng=4)
+    assert all(np.array_equal(first[name], second[name]) for name in first.columns)
+    other = mgen.generate_batch("3B", "Hard", 1000, rng=5)
+    assert not np.array_equal(first["x1"], other["x1"])
+
+
+def test_a_hundred_thousand_questions_in_one_call():
+    batch = mgen.generate_batch("3C", "Hard", 100_000, rng=6)
+    assert len(batch) == 100_000
+    assert np.array_equal(batch["x1"], -(batch["r1"] + batch["r2"]))
+    assert np.array_equal(batch["x0"], batch["r1"] * batch["r2"])
+
+
+def test_unknown_topics_are_rejected():
+    with pytest.raises(ValueError):
+        mgen.generate_batch("3Z", "Easy", 10)
+
+
+@pytest.mark.parametrize("topic,difficulty,count", [("3B", "Easy", 15), ("3C", "Easy", 15), ("3B", "Medium", 55)])
+def test_question_count_of_small_spaces(topic, difficulty, count):
+    assert mgen.question_count(topic, difficulty) == count
+    questions = {row[1] for row in mgen.generate_distinct(topic, difficulty, count, rng=7).rows()}
+    assert len(questions) == count
+
+
+@pytest.mark.parametrize("topic,difficulty,n", [("3B", "Hard", 2000), ("3A", "Hard", 5000), ("3C", "Hard", 200)])
+def test_distinct_questions_never_repeat(topic, difficulty, n):
+    batch = mgen.generate_distinct(topic, difficulty, n, rng=8)
+    assert len(batch) == n
+    assert len(np.unique(batch.hashes())) == n
+    assert len({row[1] for row in batch.rows()}) == n
+
+
+def test_asking_for_too_many_questions_raises():
+    with pytest.raises(ValueError):
+        mgen.generate_distinct("3B", "Easy", 16)
+    spec = mgen.batch_spec("3A", "Hard")
+    with pytest.raises(ValueError):
+        mgen.generate_distinct("3A", "Hard", spec.space_size() + 1)
+
+
+def test_each_seed_gives_its_question_again(monkeypatch):
+    import Crand
+    import topics
+
+    # Generate rather than read from a question bank built on this machine
+    monkeypatch.setattr(topics, "banked", lambda *args: False)
+    for code in ("3A", "3B", "3C", "3H"):
+        pairs = topics.draw_each(code, "Medium", 20, rng=9)
+        assert len({row[1] for _, row in pairs}) == 20
+        for seed, row in pairs:
+            assert topics.get(code).generate("Medium", Crand.Sampler(seed)) == row
+
+
+def test_draw_each_refuses_more_questions_than_exist(monkeypatch):
+    import topics
+
+    monkeypatch.setattr(topics, "banked", lambda *args: False)
+    assert len(topics.draw_each("3B", "Easy", 15, rng=10)) == 15
+    with pytest.raises(ValueError):
+        topics.draw_each("3B", "Easy", 16, rng=10)
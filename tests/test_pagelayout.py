@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from pagelayout import ShelfLayout
+
+
+def full_layout(layout):
+    """The placements set_sizes gives for the same sizes, to compare incremental changes with."""
+    fresh = ShelfLayout(columns=layout.columns)
+    return fresh.set_sizes(layout.sizes)
+
+
+def test_shrinking_moves_a_shelf_back_up_a_page():
+    layout = ShelfLayout()
+    layout.set_sizes([(200, 300)] * 4)
+    assert layout.placements[3].page == 1
+
+    layout.resize(3, (200, 20))
+    assert layout.placements[3][:3] == (0, 100, 1032)
+    assert layout.placements == full_layout(layout)
+
+
+def test_inserting_a_small_item_fills_the_end_of_the_page():
+    layout = ShelfLayout()
+    layout.set_sizes([(200, 300)] * 4)
+    layout.insert(3, (200, 20))
+    assert layout.placements[3].page == 0
+    assert layout.placements == full_layout(layout)
+
+
+def test_resize_to_the_same_size_changes_nothing():
+    layout = ShelfLayout()
+    layout.set_sizes([(200, 50)] * 3)
+    assert layout.resize(1, (200, 50)) == 3
+
+
+def test_a_wide_item_gets_a_shelf_of_its_own():
+    layout = ShelfLayout(columns=2)
+    narrow, wide = (200, 50), (400, 60)
+    layout.set_sizes([narrow, wide, narrow, narrow])
+    first, second, third, fourth = layout.placements
+    assert (second.x, second.y) == (first.x, first.y + 50 + layout.gap)
+    assert third.x == first.x and third.y == second.y + 60 + layout.gap
+    assert fourth.y == third.y and fourth.x > third.x
+    # Nothing runs into the next column or off the page
+    assert second.x + wide[0] <= layout.width - layout.margin
+
+
+def test_items_wider_than_a_column_never_share_a_shelf():
+    rng = random.Random(7)
+    layout = ShelfLayout(columns=2)
+    layout.set_sizes([(rng.choice([100, 280, 300, 600]), 40) for _ in range(200)])
+    for placement, size in zip(layout.placements, layout.sizes):
+        shelf = [other for other in layout.placements if (other.page, other.y) == (placement.page, placement.y)]
+        if len(shelf) > 1:
+            column_end = placement.x - layout.number_width + layout.column_width
+            assert placement.x + size[0] <= column_end
+
+
+@pytest.mark.parametrize("columns", [1, 2, 3])
+def test_incremental_changes_match_set_sizes(columns):
+    rng = random.Random(columns)
+    for _ in range(100):
+        layout = ShelfLayout(columns=columns)
+        layout.set_sizes([(rng.choice([100, 200, 500]), rng.randint(10, 400)) for _ in range(rng.randint(0, 20))])
+        for _ in range(20):
+            size = (rng.choice([100, 200, 500]), rng.randint(10, 400))
+            before = list(layout.placements)
+            action = rng.choice(["append", "insert", "remove", "resize"])
+            if action == "append" or not layout.sizes:
+                start = layout.append(size)
+            elif action == "insert":
+                start = layout.insert(rng.randint(0, len(layout)), size)
+            elif action == "remove":
+                start = layout.remove(rng.randrange(len(layout)))
+            else:
+                start = layout.resize(rng.randrange(len(layout)), size)
+            assert layout.placements == full_layout(layout)
+            # Nothing before the returned index moved
+            assert layout.placements[:start] == before[:start]
+
+
+def test_appending_one_at_a_time_matches_set_sizes():
+    layout = ShelfLayout()
+    for _ in range(20_000):
+        layout.append((200, 50))
+    assert layout.placements == full_layout(layout)
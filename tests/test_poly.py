@@ -0,0 +1,57 @@
+import random
+
+import pytest
+import sympy as sp
+
+import Crand
+import mgen
+from poly import Poly, check_with_sympy, sympy_parse
+
+
+def random_poly(rng, degree=3):
+    return Poly([rng.randint(-9, 9) for _ in range(rng.randint(0, degree) + 1)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_arithmetic_matches_sympy(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        p, q = random_poly(rng), random_poly(rng)
+        assert (p + q).to_sympy() == sp.expand(p.to_sympy() + q.to_sympy())
+        assert (p - q).to_sympy() == sp.expand(p.to_sympy() - q.to_sympy())
+        assert (p * q).to_sympy() == sp.expand(p.to_sympy() * q.to_sympy())
+        assert (p ** 2).to_sympy() == sp.expand(p.to_sympy() ** 2)
+        assert p(3) == p.to_sympy().subs(sp.Symbol("x"), 3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_text_parses_back_to_the_same_polynomial(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        p = random_poly(rng)
+        assert sp.expand(sympy_parse(p.to_text()) - p.to_sympy()) == 0
+
+
+def test_negative_terms_are_written_with_a_minus():
+    p = Poly.linear(1, -2) * Poly.linear(1, -3)
+    assert p.to_text() == "x^2 - 5x + 6"
+    assert p.to_latex() == "x^{2} - 5x + 6"
+    assert Poly([0, -1]).to_text() == "-x"
+    assert Poly([]).to_text() == "0"
+
+
+def test_polynomials_in_different_variables_do_not_mix():
+    with pytest.raises(ValueError):
+        Poly.linear(1, 1, "x") * Poly.linear(1, 1, "y")
+    # Constants take the other variable
+    assert (Poly([2], "x") * Poly.linear(1, 1, "y")).var == "y"
+
+
+@pytest.mark.parametrize("difficulty", ["Easy", "Medium", "Hard"])
+def test_generated_expansions_match_sympy(difficulty):
+    rng = Crand.Sampler(3)
+    for _ in range(50):
+        _, original, expanded = mgen.generate_linear_equation(difficulty, rng)
+        assert check_with_sympy(original, expanded)
+        _, expanded, original = mgen.generate_factorise_equation(difficulty, rng)
+        assert check_with_sympy(original, expanded)
@@ -0,0 +1,53 @@
+from fractions import Fraction
+
+import pytest
+import sympy as sp
+
+import Crand
+import quadratic
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_roots_match_sympy(seed):
+    assert quadratic.verify(150, Crand.Sampler(seed)) == []
+
+
+def test_large_coefficients_match_sympy():
+    # Discriminants above TABLE_LIMIT use trial division instead of the table
+    assert quadratic.verify(50, Crand.Sampler(3), bound=2000) == []
+
+
+@pytest.mark.parametrize("n", list(range(200)) + [9_999, 10_000, 10_007, 2 ** 4 * 3 ** 5 * 7, 123_456_789])
+def test_square_free_matches_sympy(n):
+    k, m = quadratic.square_free(n)
+    assert k * k * m == n
+    assert all(power == 1 for power in sp.factorint(m).values())
+
+
+def test_kinds_of_roots():
+    assert quadratic.solve(1, -5, 6).exact() == (Fraction(2), Fraction(3))
+    assert quadratic.solve(1, 2, 1).exact() == (Fraction(-1),)
+    assert quadratic.solve(1, 0, 1).kind == quadratic.NONE
+    assert quadratic.solve(2, 0, -1).exact() is None
+    with pytest.raises(ValueError):
+        quadratic.solve(0, 1, 1)
+
+
+def test_latex_answers():
+    assert quadratic.solve(1, -5, 6).latex() == r"x = 2,\quad x = 3"
+    assert quadratic.solve(2, -1, 0).latex() == r"x = 0,\quad x = \frac{1}{2}"
+    assert quadratic.solve(1, -2, -1).latex() == r"x = 1 \pm \sqrt{2}"
+    assert quadratic.solve(2, 0, -1).latex() == r"x = \pm\frac{\sqrt{2}}{2}"
+    assert quadratic.solve(1, 4, -8).latex() == r"x = -2 \pm 2\sqrt{3}"
+    assert quadratic.solve(1, 1, 1).latex() == r"\mathrm{no\ real\ solutions}"
+
+
+@pytest.mark.parametrize("difficulty", ["Easy", "Medium", "Hard"])
+def test_generated_questions_are_reproducible_and_solved(difficulty):
+    for seed in range(20):
+        _, equation, answer = quadratic.generate_formula_question(difficulty, Crand.Sampler(seed))
+        assert quadratic.generate_formula_question(difficulty, Crand.Sampler(seed)) == (difficulty, equation, answer)
+        if difficulty != "Hard":
+            assert "no" not in answer
+        _, equation, answer = quadratic.generate_discriminant_question(difficulty, Crand.Sampler(seed))
+        assert answer.startswith(r"\Delta = ")
@@ -0,0 +1,164 @@
+"""Worksheets as text: a LaTeX document, or one HTML page for MathJax.
+
+Nothing is rendered. The question and answer LaTeX the generators produced is written as it is,
+with the title page, the question pages in the worksheet's page order and the answer key. A
+thousand questions take milliseconds.
+
+    python textexport.py worksheet.satp worksheet.tex
+    python textexport.py worksheet.satp worksheet.html
+
+exports a saved project. The GUI exports the open worksheet from Print > LaTeX and Print > HTML.
+"""
+import argparse
+import html
+import os
+
+import topics
+
+MATHJAX_URL = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"
+
+_TEX_SPECIAL = {"\\": r"\textbackslash{}", "&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_",
+                "{": r"\{", "}": r"\}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}"}
+
+
+def tex_escape(text):
+    """Plain text made safe to put in a LaTeX document."""
+    return "".join(_TEX_SPECIAL.get(char, char) for char in text)
+
+
+def question_rows(questions):
+    """(page, question LaTeX, answer LaTeX) for questions given as project records.
+
+    Only the topic, text, answer and page of each record are used.
+    """
+    rows = []
+    for question in questions:
+        topic = topics.TOPICS.get(question["topic"])
+        if topic is None:
+            rows.append((question["page"], question["text"], topics.answer_text(question["answer"])))
+        else:
+            rows.append((question["page"], topic.question_latex(question["text"]),
+                         topic.format_answer(question["answer"])))
+    return rows
+
+
+def _pages(rows):
+    """Numbered questions grouped by page, in page order."""
+    pages = {}
+    for number, (page, question, _) in enumerate(rows, start=1):
+        pages.setdefault(page, []).append((number, question))
+    return [pages[page] for page in sorted(pages)]
+
+
+def tex_document(title, questions):
+    rows = question_rows(questions)
+    out = [r"\documentclass[12pt,a4paper]{article}",
+           r"\usepackage{amsmath}",
+           r"\usepackage[margin=2cm]{geometry}",
+           r"\begin{document}",
+           r"\begin{titlepage}",
+           r"\centering",
+           rf"{{\Huge {tex_escape(title)}\par}}",
+           r"\vspace{1cm}",
+           rf"{{\Large {tex_escape(topics.CHAPTER)}\par}}",
+           r"\vspace{2cm}",
+           r"Name: \rule{8cm}{0.4pt}",
+           r"\end{titlepage}"]
+
+    for index, page in enumerate(_pages(rows)):
+        if index:
+            out.append(r"\newpage")
+        # Numbers carry on from the previous page
+        out.append(r"\begin{enumerate}")
+        out.append(rf"\setcounter{{enumi}}{{{page[0][0] - 1}}}")
+        out.extend(rf"\item ${question}$" for _, question in page)
+        out.append(r"\end{enumerate}")
+
+    out.append(r"\newpage")
+    out.append(r"\section*{Answers}")
+    if rows:
+        out.append(r"\begin{enumerate}")
+        out.extend(rf"\item ${answer}$" for _, _, answer in rows)
+        out.append(r"\end{enumerate}")
+    out.append(r"\end{document}")
+    return "\n".join(out) + "\n"
+
+
+def html_document(title, questions):
+    rows = question_rows(questions)
+    title = html.escape(title)
+    out = ["<!DOCTYPE html>",
+           '<html lang="en">',
+           "<head>",
+           '<meta charset="utf-8">',
+           f"<title>{title}</title>",
+           "<script>window.MathJax = {tex: {inlineMath: [['\\\\(', '\\\\)']]}};</script>",
+           f'<script defer src="{MATHJAX_URL}"></script>',
+           "<style>",
+           "body { font-family: sans-serif; max-width: 50em; margin: auto; }",
+           "section { break-after: page; }",
+           ".title-page { text-align: center; padding-top: 8em; }",
+           "li { margin: 0.8em 0; }",
+           "</style>",
+           "</head>",
+           "<body>",
+           '<section class="title-page">',
+           f"<h1>{title}</h1>",
+           f"<p>{html.escape(topics.CHAPTER)}</p>",
+           "<p>Name: ______________________</p>",
+           "</section>"]
+
+    for index, page in enumerate(_pages(rows), start=1):
+        out.append(f'<section class="questions" id="page-{index}">')
+        out.append(f'<ol start="{page[0][0]}">')
+        out.extend(f"<li>\\({html.escape(question, quote=False)}\\)</li>" for _, question in page)
+        out.append("</ol>")
+        out.append("</section>")
+
+    out.append('<section class="answers">')
+    out.append("<h2>Answers</h2>")
+    out.append("<ol>")
+    out.extend(f"<li>\\({html.escape(answer, quote=False)}\\)</li>" for _, _, answer in rows)
+    out.append("</ol>")
+    out.append("</section>")
+    out.append("</body>")
+    out.append("</html>")
+    return "\n".join(out) + "\n"
+
+
+def export(path, title, questions):
+    """Write questions (project records) as LaTeX, or as HTML if path ends in .html or .htm."""
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        document = html_document(title, questions)
+    else:
+        document = tex_document(title, questions)
+
+    # Write to a temporary file first so a failed export never leaves half a file behind
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(document)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def main(argv=None):
+    import project
+
+    parser = argparse.ArgumentParser(description="Export a saved worksheet as LaTeX or HTML.")
+    parser.add_argument("project", help="a .satp project file")
+    parser.add_argument("out", help="a .tex or .html file")
+    parser.add_argument("--title", help="title for the title page, the project name by default")
+    args = parser.parse_args(argv)
+
+    opened = project.load(args.project)
+    title = args.title or os.path.splitext(os.path.basename(args.project))[0]
+    export(args.out, title, opened.questions)
+    print(f"Wrote {len(opened.questions)} questions to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""The question topics and how to generate each of them.
+
+Every topic in the chapter is registered here with
+
+    generate(difficulty, rng)   one question as (difficulty, question, answer)
+    batch(difficulty, n, rng, distinct)
+                                a list of n such rows at once
+    format_answer(answer)       the answer as LaTeX for the answer pages
+    render(text, size, dpi)     PNG of a question, None for questions written as mathtext
+    latex(text)                 LaTeX for a question that is not written as LaTeX, for text export
+    cost                        CHEAP topics are generated where they are asked for, HEAVY ones
+                                are handed to the worker processes in heavy.py by the GUI
+
+The GUI, farm.py and the benchmarks all find their generators through get(), so a new topic only
+has to be registered here. Topics without a generator are listed but cannot be added yet.
+"""
+from functools import partial
+
+import Crand
+import graphs
+import mgen
+import quadratic
+
+CHAPTER = "Chapter 3: Quadratics"
+
+CHEAP = "cheap"
+HEAVY = "heavy"
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+
+# Give up on finding distinct questions after this many draws per question asked for
+DISTINCT_ATTEMPTS = 20
+
+
+def answer_text(answer):
+    """LaTeX for an answer as returned by the generators. Tuples are roots of an equation."""
+    if isinstance(answer, tuple):
+        roots = sorted(set(answer))
+        return r",\quad ".join(f"x = {root}" for root in roots)
+    return str(answer)
+
+
+def encode_answer(answer):
+    """An answer in a form JSON keeps. Tuples of roots would come back as lists, so they are marked."""
+    return {"roots": list(answer)} if isinstance(answer, tuple) else answer
+
+
+def decode_answer(answer):
+    return tuple(answer["roots"]) if isinstance(answer, dict) else answer
+
+
+def mgen_batch(code, difficulty, n, rng=None, distinct=False):
+    """Batch function for topics that have BatchSpecs in mgen."""
+    generate = mgen.generate_distinct if distinct else mgen.generate_batch
+    return generate(code, difficulty, n, rng).rows()
+
+
+class Topic:
+    def __init__(self, code, title, generate=None, batch=None, format_answer=answer_text, cost=CHEAP,
+                 render=None, latex=None):
+        self.code = code
+        self.title = title
+        self.generate = generate
+        self._batch = batch
+        self.format_answer = format_answer
+        self.cost = cost
+        self.render = render
+        self.latex = latex
+
+    @property
+    def label(self):
+        return f"{self.code} {self.title}"
+
+    @property
+    def available(self):
+        return self.generate is not None
+
+    def question_latex(self, text):
+        return self.latex(text) if self.latex is not None else text
+
+    def batch(self, difficulty, n, rng=None, distinct=False):
+        """n questions as (difficulty, question, answer) rows.
+
+        Topics without a batch function call generate n times. With distinct, repeated questions
+        are drawn again, and ValueError is raised if not enough different ones turn up.
+        """
+        if self._batch is not None:
+            return self._batch(difficulty, n, rng, distinct)
+
+        rng = Crand.sampler(rng)
+        rows, seen = [], set()
+        for _ in range(n * DISTINCT_ATTEMPTS if distinct else n):
+            row = self.generate(difficulty, rng)
+            if distinct:
+                if row[1] in seen:
+                    continue
+                seen.add(row[1])
+            rows.append(row)
+            if len(rows) == n:
+                return rows
+        raise ValueError(f"Could not find {n} different {self.code} {difficulty} questions")
+
+
+TOPICS = {}
+
+
+def register(topic):
+    TOPICS[topic.code] = topic
+    return topic
+
+
+def get(code):
+    try:
+        return TOPICS[code]
+    except KeyError:
+        raise ValueError(f"Unknown topic {code}") from None
+
+
+def renderer(code):
+    """The render function for questions of a topic, None for mathtext."""
+    topic = TOPICS.get(code)
+    return topic.render if topic is not None else None
+
+
+def draw(code, difficulty, n, rng=None, cache=None):
+    """n different questions of a topic, from the question bank when it has enough of them.
+
+    Topics that are not in the bank, or not often enough, are generated. cache is a RenderCache
+    to put the bank's pre-rendered images in.
+    """
+    import qbank
+
+    if banked(code, difficulty, n):
+        return qbank.default_bank().sample(code, difficulty, n, rng, cache)
+    return get(code).batch(difficulty, n, rng, distinct=True)
+
+
+def question_count(code, difficulty):
+    """How many different questions a topic and difficulty can produce, or None if it is not known."""
+    if (code, difficulty) in mgen.BATCH_SPECS:
+        return mgen.question_count(code, difficulty)
+    return None
+
+
+def draw_each(code, difficulty, n, rng=None, cache=None):
+    """n different questions as (seed, row) pairs, each row made from its own seed.
+
+    The seed alone gives the row again: QuestionBank.pick when the bank has n questions of the topic,
+    otherwise the topic's generate(difficulty, Crand.Sampler(seed)). A seed whose question repeats an
+    earlier one is replaced by a new seed. Raises ValueError when the topic cannot make n different
+    questions.
+    """
+    import qbank
+
+    available = question_count(code, difficulty)
+    if available is not None and n > available:
+        raise ValueError(f"{code} {difficulty} has only {available} different questions, not {n}")
+    topic = get(code)
+    rng = Crand.sampler(rng)
+    bank = qbank.default_bank() if banked(code, difficulty, n) else None
+    pairs, seen, draws = [], set(), 0
+    while len(pairs) < n and draws < n * DISTINCT_ATTEMPTS:
+        seeds = [rng.randint(0, 2 ** 32 - 1) for _ in range(n - len(pairs))]
+        draws += len(seeds)
+        if bank is not None:
+            rows = bank.pick(code, difficulty, seeds, cache)
+        else:
+            rows = [topic.generate(difficulty, Crand.Sampler(seed)) for seed in seeds]
+        for seed, row in zip(seeds, rows):
+            if row[1] not in seen:
+                seen.add(row[1])
+                pairs.append((seed, row))
+    if len(pairs) < n:
+        raise ValueError(f"Could not find {n} different {code} {difficulty} questions")
+    return pairs
+
+
+def banked(code, difficulty, n):
+    """Whether the question bank has n questions of a topic and difficulty to draw from."""
+    import qbank
+
+    bank = qbank.default_bank()
+    return bank is not None and bank.count(code, difficulty) >= n
+
+
+def available():
+    """Codes of the topics that can be generated."""
+    return [code for code, topic in TOPICS.items() if topic.available]
+
+
+register(Topic("3A", "Expanding and collecting like terms", mgen.generate_linear_equation,
+               partial(mgen_batch, "3A")))
+register(Topic("3B", "Factorising", mgen.generate_factorise_equation, partial(mgen_batch, "3B")))
+register(Topic("3C", "Quadratic Equations", mgen.construct_quadratic, partial(mgen_batch, "3C")))
+register(Topic("3D", "Graphing Quadratics", graphs.generate_graph_question, graphs.graph_batch,
+               render=graphs.render_graph, latex=graphs.graph_latex))
+register(Topic("3F", "Completing The Square And Turning Points"))
+register(Topic("3G", "Solving Quadratic Inequalities"))
+register(Topic("3H", "The General Quadratic Formula", quadratic.generate_formula_question))
+register(Topic("3I", "The Discriminant", quadratic.generate_discriminant_question))
+register(Topic("3J", "Solving Simultaneous Linear and Quadratic Equations", mgen.generate_simultaneous_equations,
+               cost=HEAVY))
+register(Topic("3K", "Families of Quadratic Polynomial Functions"))
+register(Topic("3L", "Quadratic Models"))